@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Reader for the binary latency output of `bench -b u32|f32`.
+
+The file is a bin_header_t (src/utils.h) followed by `count` little-endian
+uint32 (whole ns, the values the text output prints) or float32 samples.
+open_samples maps the samples with np.memmap, so nothing is parsed or
+copied before the analysis touches it.
+
+  ../src/bench -t 1 -r 1 -i 3 -I 8 -T 0 -m 4096 -b u32 > pc/results/N0m1_1.bin
+  python3 mio/proc/binfmt.py pc/results/N0m1_1.bin
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+MAGIC = b"MIOLAT\0\0"
+VERSION = 1
+# Mirrors bin_header_t; packed, little-endian
+HEADER_DTYPE = np.dtype([
+    ("magic", "u1", (8,)),
+    ("version", "<u4"),
+    ("header_size", "<u4"),
+    ("dtype", "<u4"),
+    ("node", "<i4"),
+    ("threads", "<u4"),
+    ("mode", "<u4"),
+    ("interval", "<u8"),
+    ("tsc_ghz", "<f8"),
+    ("count", "<u8"),
+    ("iterations", "<u4"),
+    ("starting_core", "<i4"),
+    ("random", "u1"),
+    ("reserved", "u1", (15,)),
+])
+# out_format_t values
+SAMPLE_DTYPES = {1: np.dtype("<u4"), 2: np.dtype("<f4")}
+# types_t values
+MODES = {0: "pc", 1: "rd", 2: "wr", 3: "rd_bw", 4: "wr_bw"}
+
+
+def read_header(path: Path) -> Dict[str, object]:
+    """Header fields of a binary bench output as plain Python values."""
+    raw = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(raw) == 0 or raw["magic"][0].tobytes() != MAGIC:
+        raise ValueError(f"{path} is not a binary MIO latency file")
+    h = {name: raw[name][0].item() for name in HEADER_DTYPE.names if name not in ("magic", "reserved")}
+    if h["version"] != VERSION:
+        raise ValueError(f"{path}: unsupported version {h['version']}")
+    if h["dtype"] not in SAMPLE_DTYPES:
+        raise ValueError(f"{path}: unknown sample type {h['dtype']}")
+    h["mode_name"] = MODES.get(h["mode"], str(h["mode"]))
+    h["random"] = bool(h["random"])
+    return h
+
+
+def open_samples(path: Path) -> Tuple[Dict[str, object], np.memmap]:
+    """(header, read-only memmap of the samples). A run cut short keeps only its complete samples."""
+    h = read_header(path)
+    dtype = SAMPLE_DTYPES[h["dtype"]]
+    available = (Path(path).stat().st_size - h["header_size"]) // dtype.itemsize
+    count = min(h["count"], available)
+    if count == 0:
+        return h, np.zeros(0, dtype=dtype)
+    return h, np.memmap(path, dtype=dtype, mode="r", offset=h["header_size"], shape=(count,))
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Show the header and a summary of a binary MIO latency file")
+    p.add_argument("path", type=Path)
+    args = p.parse_args()
+
+    h, samples = open_samples(args.path)
+    for k, v in h.items():
+        print(f"{k}: {v}")
+    if len(samples):
+        print(f"samples: {len(samples)}, mean {samples.mean(dtype=np.float64):.2f} ns, "
+              f"p50 {np.percentile(samples, 50):.1f} ns, max {samples.max()} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Loaded-latency curves from a full MIO sweep (`run.sh`).
+
+Finds every runx.sh output under <root>/{pc,rd,wr}/<results dir>, builds
+the latency histogram of each file in a worker process (latency.py) and
+writes one table: per prefetcher setting, mode, memory node and thread
+count, the latency percentiles next to the background thread count and the
+ratio to the local node at the same load.
+
+  python3 mio/proc/curves.py --root mio --out-csv mio/proc/out/latency_curves.csv --plot-dir mio/proc/out
+
+In rd/wr one thread chases pointers while threads - 1 stream reads/writes in
+the background; in pc all threads chase pointers and none are background.
+A node is `local` when it is the CPU node of the run, `cxl` when it has no
+CPUs (from sysinfo.txt, or --cxl-nodes), and `remote` otherwise.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+import pandas as pd
+
+try:
+    from mio.proc.latency import (CHUNK_LINES, PERCENTILES, find_runs, histogram_files, percentile_label,
+                                  summarize_runs)
+except ImportError:  # allow running as plain script
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from mio.proc.latency import (CHUNK_LINES, PERCENTILES, find_runs, histogram_files, percentile_label,
+                                  summarize_runs)
+
+MODES = ("pc", "rd", "wr")
+SYSINFO = "sysinfo.txt"
+NUMA_CPUS = re.compile(r"^node (\d+) cpus:(.*)$")
+# Percentiles compared against the local node
+RATIO_PERCENTILES = (50, 99, 99.9)
+
+
+def cpuless_nodes(sysinfo: Path) -> Set[int]:
+    """NUMA nodes listed without CPUs in the `numactl --hardware` part of sysinfo.txt."""
+    nodes = set()
+    if not sysinfo.exists():
+        return nodes
+    for line in sysinfo.read_text(errors="replace").splitlines():
+        m = NUMA_CPUS.match(line.strip())
+        if m and not m.group(2).strip():
+            nodes.add(int(m.group(1)))
+    return nodes
+
+
+def find_sweep(root: Path, modes: Iterable[str] = MODES) -> List[Path]:
+    return find_runs([root / m for m in modes if (root / m).is_dir()])
+
+
+def build_curves(files: List[Path], jobs: int = -1, chunksize: int = CHUNK_LINES,
+                 cxl_nodes: Optional[Set[int]] = None) -> pd.DataFrame:
+    """Percentile table of every (results, mode, node, threads) with load and local-ratio columns."""
+    hists = histogram_files(files, jobs, chunksize)
+    by = ["results", "mode", "cpu_node", "node", "threads"]
+    table = summarize_runs(files, hists, PERCENTILES, by)
+    cxl_nodes = cxl_nodes or set()
+
+    table.insert(5, "background_threads", (table["threads"] - 1).where(table["mode"] != "pc", 0))
+    table.insert(4, "tier", [
+        "local" if n == c else ("cxl" if n in cxl_nodes else "remote")
+        for n, c in zip(table["node"], table["cpu_node"])
+    ])
+    keys = ["results", "mode", "cpu_node", "threads"]
+    cols = [percentile_label(q) for q in RATIO_PERCENTILES]
+    local = table.loc[table["tier"] == "local", keys + cols]
+    merged = table[keys].merge(local, on=keys, how="left")
+    for c in cols:
+        table[f"{c}_vs_local"] = table[c].to_numpy() / merged[c].to_numpy()
+    return table
+
+
+def plot_curves(table: pd.DataFrame, out_dir: Path) -> List[Path]:
+    """One figure per (results, mode): tail percentiles against load, a line per node."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    cols = [percentile_label(q) for q in RATIO_PERCENTILES]
+    saved = []
+    for (results, mode), g in table.groupby(["results", "mode"], sort=True):
+        x = "threads" if mode == "pc" else "background_threads"
+        fig, axes = plt.subplots(1, len(cols), figsize=(4 * len(cols), 3.5), sharex=True)
+        for ax, c in zip(axes, cols):
+            for (node, tier), gn in g.groupby(["node", "tier"], sort=True):
+                ax.plot(gn[x], gn[c], marker="o", label=f"node {node} ({tier})")
+            ax.set_title(c)
+            ax.set_xlabel(x.replace("_", " "))
+            ax.set_ylabel("latency (ns)")
+            ax.grid(True, alpha=0.3)
+        axes[0].legend(fontsize=8)
+        fig.suptitle(f"{mode} / {results}")
+        fig.tight_layout()
+        path = out_dir / f"curves_{mode}_{results}.png"
+        fig.savefig(path, dpi=120)
+        plt.close(fig)
+        saved.append(path)
+    return saved
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Loaded-latency curves of an MIO pc/rd/wr sweep")
+    p.add_argument("--root", type=Path, default=Path("mio"), help="MIO folder holding pc/, rd/ and wr/")
+    p.add_argument("--modes", type=str, default=",".join(MODES))
+    p.add_argument("--jobs", type=int, default=-1, help="Parallel files (-1 for all cores)")
+    p.add_argument("--chunk-lines", type=int, default=CHUNK_LINES, help="Lines parsed per chunk")
+    p.add_argument("--cxl-nodes", type=str, default=None,
+                   help="Comma-separated CXL (CPU-less) nodes; default from <root>/sysinfo.txt")
+    p.add_argument("--out-csv", type=Path, default=Path("mio/proc/out/latency_curves.csv"))
+    p.add_argument("--plot-dir", type=Path, default=None, help="Also draw one figure per mode and results dir")
+    args = p.parse_args()
+
+    files = find_sweep(args.root, [m.strip() for m in args.modes.split(",") if m.strip()])
+    if not files:
+        raise SystemExit(f"No N<cpu>m<node>_<threads>.txt/.bin files under {args.root}/{{{args.modes}}}")
+    if args.cxl_nodes is not None:
+        cxl = {int(n) for n in args.cxl_nodes.split(",") if n.strip()}
+    else:
+        cxl = cpuless_nodes(args.root / SYSINFO)
+    print(f"{len(files)} runs; CXL nodes: {sorted(cxl) or 'none'}")
+
+    table = build_curves(files, args.jobs, args.chunk_lines, cxl)
+    with pd.option_context("display.width", 200, "display.max_columns", 30, "display.float_format", "{:.4g}".format):
+        print(table.drop(columns=["cpu_node", "count", "min"]).to_string(index=False))
+    args.out_csv.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(args.out_csv, index=False)
+    print(f"Saved {args.out_csv}")
+    if args.plot_dir:
+        for path in plot_curves(table, args.plot_dir):
+            print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    main()
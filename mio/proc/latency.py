@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Streaming latency percentiles for MIO output files.
+
+`bench` prints one latency (ns, averaged over -I accesses) per line into
+`<pc|rd|wr>/<results dir>/N0m<node>_<threads>.txt` (or raw samples into
+`.bin` with `bench -b u32|f32`, read through a memmap by binfmt.py). Files are parsed in
+chunks and folded into a LatencyHistogram, so memory stays fixed no matter
+how many lines a run has. Histograms are integer bucket counts: merging the
+histograms of several files gives exactly the histogram of their
+concatenation.
+
+  python3 mio/proc/latency.py mio/pc/results-pref-off/*.txt
+  python3 mio/proc/latency.py mio/rd/results-pref-off --jobs 8 --out-csv rd.csv
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from mio.proc.binfmt import open_samples
+except ImportError:  # allow running as plain script
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from mio.proc.binfmt import open_samples
+
+# Lines parsed per chunk; bounds peak memory of the reader
+CHUNK_LINES = 4_000_000
+# Values below 2**SUB_BITS are counted exactly; above, buckets are 2**-(SUB_BITS - 1) wide (relative)
+SUB_BITS = 8
+# Largest value kept apart from the top bucket (the bench stores int / uint32 latencies)
+MAX_BITS = 32
+PERCENTILES = (50, 90, 99, 99.9, 99.99)
+RUN_NAME = re.compile(r"N(?P<cpu_node>\d+)m(?P<node>\d+)_(?P<threads>\d+)$")
+RUN_SUFFIXES = (".txt", ".bin")
+
+
+class LatencyHistogram:
+    """
+    HDR-style log-linear histogram of non-negative integer latencies.
+
+    A value v with bit length b > SUB_BITS falls into sub-bucket v >> (b - SUB_BITS)
+    of power-of-two range b, so every bucket is at most 1 / 2**(SUB_BITS - 1)
+    of its value wide. The exact count, sum, min and max are kept beside the
+    bucket counts.
+    """
+
+    def __init__(self, sub_bits: int = SUB_BITS, max_bits: int = MAX_BITS):
+        self.sub_bits = sub_bits
+        self.max_bits = max_bits
+        self.half = 1 << (sub_bits - 1)
+        self.max_shift = max(0, max_bits - sub_bits)
+        self.counts = np.zeros((self.max_shift + 2) * self.half, dtype=np.int64)
+        self.total = 0
+        self.sum = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _index(self, values: np.ndarray) -> np.ndarray:
+        v = np.clip(values, 0, (1 << self.max_bits) - 1)
+        # frexp exponent is the bit length for v >= 1 (exact below 2**53)
+        bits = np.frexp(v.astype(np.float64))[1]
+        shift = np.maximum(bits - self.sub_bits, 0)
+        return (shift << (self.sub_bits - 1)) + (v >> shift)
+
+    def record(self, values) -> None:
+        """Add a batch of latencies; floats are truncated to whole ns like the bench does."""
+        v = np.asarray(values)
+        if v.size == 0:
+            return
+        v = v.astype(np.int64, copy=False)
+        self.counts += np.bincount(self._index(v), minlength=len(self.counts))
+        self.total += int(v.size)
+        self.sum += int(v.sum())
+        self.min = min(self.min, int(v.min()))
+        self.max = max(self.max, int(v.max()))
+
+    def merge(self, other: "LatencyHistogram") -> "LatencyHistogram":
+        if (other.sub_bits, other.max_bits) != (self.sub_bits, self.max_bits):
+            raise ValueError("Histograms with different precision cannot be merged")
+        self.counts += other.counts
+        self.total += other.total
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def bucket_bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Lowest and highest value (inclusive) of every bucket."""
+        idx = np.arange(len(self.counts), dtype=np.int64)
+        shift = np.maximum(idx // self.half - 1, 0)
+        lo = np.where(idx < 2 * self.half, idx, (idx - (shift << (self.sub_bits - 1))) << shift)
+        return lo, lo + (1 << shift) - 1
+
+    def percentiles(self, qs: Iterable[float] = PERCENTILES) -> Dict[float, float]:
+        """
+        Value at each percentile: the highest value of the bucket holding rank
+        ceil(q / 100 * count), clipped to the exact min/max. Exact for values
+        below 2**sub_bits.
+        """
+        qs = list(qs)
+        if self.total == 0:
+            return {q: math.nan for q in qs}
+        cum = np.cumsum(self.counts)
+        ranks = np.maximum(1, np.ceil(np.array(qs) / 100.0 * self.total)).astype(np.int64)
+        _, hi = self.bucket_bounds()
+        vals = np.clip(hi[np.searchsorted(cum, ranks)], self.min, self.max)
+        return {q: float(v) for q, v in zip(qs, vals)}
+
+    def summary(self, qs: Iterable[float] = PERCENTILES) -> Dict[str, float]:
+        out = {"count": self.total, "mean": self.sum / self.total if self.total else math.nan,
+               "min": self.min if self.total else math.nan}
+        out.update({percentile_label(q): v for q, v in self.percentiles(qs).items()})
+        out["max"] = self.max if self.total else math.nan
+        return out
+
+
+def percentile_label(q: float) -> str:
+    """50 -> 'p50', 99.9 -> 'p99.9'."""
+    return f"p{q:g}"
+
+
+def iter_latency_chunks(path: Path, chunksize: int = CHUNK_LINES) -> Iterator[np.ndarray]:
+    """
+    Latencies of a bench output in int64 chunks. In text output, lines that
+    are not a single number (e.g. the `ERROR i, n` lines older bench builds
+    printed to stdout) are skipped; binary output is sliced straight from
+    the memmap.
+    """
+    if Path(path).suffix == ".bin":
+        _, samples = open_samples(path)
+        for i in range(0, len(samples), chunksize):
+            yield samples[i:i + chunksize].astype(np.int64)
+        return
+    reader = pd.read_csv(
+        path, engine="c", header=None, names=["ns"],
+        skip_blank_lines=True, on_bad_lines="skip", chunksize=chunksize,
+    )
+    for chunk in reader:
+        ns = chunk["ns"]
+        if pd.api.types.is_integer_dtype(ns):
+            yield ns.to_numpy(dtype=np.int64)
+            continue
+        # Only chunks with stray text need coercing
+        if not pd.api.types.is_numeric_dtype(ns):
+            ns = pd.to_numeric(ns, errors="coerce")
+        v = ns.to_numpy(dtype=np.float64)
+        yield v[np.isfinite(v)].astype(np.int64)
+
+
+def histogram_file(path: Path, chunksize: int = CHUNK_LINES) -> LatencyHistogram:
+    hist = LatencyHistogram()
+    for chunk in iter_latency_chunks(path, chunksize):
+        hist.record(chunk)
+    return hist
+
+
+def parse_run_name(path: Path) -> Dict[str, object]:
+    """mode (pc/rd/wr), results dir, nodes and thread count from `<mode>/<dir>/N0m<node>_<threads>.txt`."""
+    m = RUN_NAME.search(Path(path).stem)
+    if m is None:
+        raise ValueError(f"{path} is not named N<cpu>m<node>_<threads>")
+    path = Path(path)
+    return {
+        "mode": path.parents[1].name if len(path.parents) > 1 else "",
+        "results": path.parent.name,
+        "cpu_node": int(m["cpu_node"]),
+        "node": int(m["node"]),
+        "threads": int(m["threads"]),
+    }
+
+
+def find_runs(paths: Iterable[Path]) -> List[Path]:
+    """Expand folders into the run files below them; files are kept as given."""
+    out: List[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            out += sorted(f for f in p.rglob("N*m*_*") if f.suffix in RUN_SUFFIXES and RUN_NAME.search(f.stem))
+        else:
+            out.append(p)
+    return out
+
+
+def histogram_files(files: List[Path], jobs: int = -1, chunksize: int = CHUNK_LINES) -> List[LatencyHistogram]:
+    """One histogram per file, computed in a process pool (one file per task), in input order."""
+    jobs = min(jobs if jobs > 0 else (os.cpu_count() or 1), len(files))
+    if jobs <= 1:
+        return [histogram_file(f, chunksize) for f in files]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(histogram_file, files, [chunksize] * len(files)))
+
+
+def summarize_runs(files: List[Path], hists: List[LatencyHistogram], qs: Iterable[float] = PERCENTILES,
+                   by: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Percentile table with one row per group of runs; runs of the same group
+    (default: mode, results dir, node, threads) are merged first.
+    """
+    by = by or ["mode", "results", "node", "threads"]
+    groups: Dict[tuple, LatencyHistogram] = {}
+    files_per_group: Dict[tuple, int] = {}
+    for f, h in zip(files, hists):
+        info = parse_run_name(f)
+        key = tuple(info[k] for k in by)
+        if key in groups:
+            groups[key].merge(h)
+        else:
+            groups[key] = LatencyHistogram(h.sub_bits, h.max_bits).merge(h)
+        files_per_group[key] = files_per_group.get(key, 0) + 1
+    rows = [{**dict(zip(by, key)), "files": files_per_group[key], **h.summary(qs)} for key, h in groups.items()]
+    return pd.DataFrame(rows).sort_values(by, ignore_index=True)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Latency percentiles of MIO bench output files")
+    p.add_argument("paths", type=Path, nargs="+", help="N0m<node>_<threads>.txt/.bin files or folders holding them")
+    p.add_argument("--jobs", type=int, default=-1, help="Parallel files (-1 for all cores)")
+    p.add_argument("--chunk-lines", type=int, default=CHUNK_LINES, help="Lines parsed per chunk")
+    p.add_argument("--percentiles", type=str, default=",".join(f"{q:g}" for q in PERCENTILES))
+    p.add_argument("--out-csv", type=Path, default=None)
+    args = p.parse_args()
+
+    files = find_runs(args.paths)
+    if not files:
+        raise SystemExit("No N<cpu>m<node>_<threads>.txt/.bin files found")
+    qs = [float(q) for q in args.percentiles.split(",") if q.strip()]
+    table = summarize_runs(files, histogram_files(files, args.jobs, args.chunk_lines), qs)
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(table.to_string(index=False))
+    if args.out_csv:
+        args.out_csv.parent.mkdir(parents=True, exist_ok=True)
+        table.to_csv(args.out_csv, index=False)
+        print(f"Saved {args.out_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -132,7 +132,7 @@ void verify(header_t* header) {
   uint64_t i = 0;
   while (i < header->num_chase_block) {
     if ((int)(curr_ptr->ptr_arr[3]) != 0) {
-      printf("ERROR %lu, %lu\n", i, curr_ptr->ptr_arr[3]);
+      fprintf(stderr, "ERROR %lu, %lu\n", i, curr_ptr->ptr_arr[3]);
       break;
     }
     curr_ptr->ptr_arr[3] = (int)curr_ptr->ptr_arr[3] + 1;
@@ -212,7 +212,7 @@ void pointer_chasing(header_t* header) {
   uint64_t result, latency_sum = 0; uint64_t avg_cycle = 0;
   uint64_t cnt = 0;
   uint64_t start[2], end[2];
-  int *records_buf = (int *) header->records_buf;
+  uint32_t *records_buf = (uint32_t *) header->records_buf;
   if (header->start_addr_a == NULL) {
     fprintf(stderr, "ERROR header->start_addr_a == NULL\n");
     return;
@@ -228,7 +228,12 @@ void pointer_chasing(header_t* header) {
       result = op_ptr_chase(((chase_t*)(header->start_addr_a))+j, interval);
       latency_sum += result;
       if (header->print) {
-        records_buf[cnt] = (1.0 / header->tsc_freq) * (result / interval);
+        if (header->out_format == OUT_F32) {
+          float ns = (1.0 / header->tsc_freq) * ((double)result / interval);
+          memcpy(&records_buf[cnt], &ns, sizeof(ns));
+        } else {
+          records_buf[cnt] = (1.0 / header->tsc_freq) * (result / interval);
+        }
       }
       cnt += 1;
     }
@@ -298,7 +303,7 @@ void* thread_wrapper(void* arg) {
 	  alloc_node = 1;
   }
   if (header->print) {
-    ret = init_buf((header->num_chase_block/header->chase_interval)*header->op_iter*sizeof(int), alloc_node, &(header->records_buf));
+    ret = init_buf((header->num_chase_block/header->chase_interval)*header->op_iter*sizeof(uint32_t), alloc_node, &(header->records_buf));
     if (ret < 0) {
       fprintf(stderr, "ERROR init_buf (records) in thread %d.\n", header->thread_idx);
       numa_free(header->buf_a, header->total_buf_size);
@@ -322,6 +327,32 @@ void* thread_wrapper(void* arg) {
   return NULL;
 }
 
+// Raw samples of the given threads behind a bin_header_t, in one fwrite per thread
+void write_binary(header_t* header, header_t* header_arr, int num_threads) {
+  uint64_t per_thread = (header->num_chase_block/header->chase_interval)*header->op_iter;
+  bin_header_t bh;
+  memset(&bh, 0, sizeof(bh));
+  memcpy(bh.magic, BIN_MAGIC, sizeof(bh.magic));
+  bh.version = BIN_VERSION;
+  bh.header_size = sizeof(bin_header_t);
+  bh.dtype = header->out_format;
+  bh.node = header->buf_a_numa_node;
+  bh.threads = header->num_thread;
+  bh.mode = header->type;
+  bh.interval = header->chase_interval;
+  bh.tsc_ghz = header->tsc_freq;
+  bh.count = per_thread * num_threads;
+  bh.iterations = header->op_iter;
+  bh.starting_core = header->starting_core;
+  bh.random = header->random;
+  fwrite(&bh, sizeof(bh), 1, stdout);
+  for (int i = 0; i < num_threads; i++) {
+    // u32 and f32 samples are both 4 bytes
+    fwrite(header_arr[i].records_buf, sizeof(uint32_t), per_thread, stdout);
+  }
+  fflush(stdout);
+}
+
 int run(header_t* header) {
   pthread_t* thread_arr;
   header_t* header_arr;
@@ -361,20 +392,26 @@ int run(header_t* header) {
 
   pthread_barrier_destroy(&barrier);
   // print memory latency
-  if (header->print) {
+  if (header->print && header->out_format != OUT_TEXT) {
+    if (header->type == POINTER_CHASING) {
+      write_binary(header, header_arr, num_thread);
+    } else if (header->type == LOADED_POINTER_CHASING || header->type == LOADED_POINTER_CHASING_WR) {
+      write_binary(header, header_arr, 1);
+    }
+  } else if (header->print) {
     if (header->type == POINTER_CHASING) {
       for (int i = 0; i < num_thread; i++) {
-        int *records_buf = (int *) header_arr[i].records_buf;
+        uint32_t *records_buf = (uint32_t *) header_arr[i].records_buf;
         for (uint64_t k = 0; k < (header->num_chase_block/header->chase_interval)*header->op_iter; k += 1) {
-          printf("%d\n", records_buf[k]);
+          printf("%u\n", records_buf[k]);
         }
       }
     } else if (header->type == LOADED_POINTER_CHASING || header->type == LOADED_POINTER_CHASING_WR) {
       int num_threads = 1;
       for (int i = 0; i < num_threads; i++) {
-        int *records_buf = (int *) header_arr[i].records_buf;
+        uint32_t *records_buf = (uint32_t *) header_arr[i].records_buf;
         for (uint64_t k = 0; k < (header->num_chase_block/header->chase_interval)*header->op_iter; k += 1) {
-          printf("%d\n", records_buf[k]);
+          printf("%u\n", records_buf[k]);
         }
       }
     }
@@ -15,6 +15,7 @@
 
 void set_default(header_t* header) {
   header->print = 1;
+  header->out_format = OUT_TEXT;
   header->num_thread = 1;
   header->total_buf_size = (1 << 30);
   header->buf_a_numa_node = 0;
@@ -37,7 +38,7 @@ int parse_arg(int argc, char*argv[], header_t* header) {
   // int write;
   set_default(header);
 
-  while ((opt = getopt(argc, argv, "t:m:i:r:I:T:P:c:R")) != -1) {
+  while ((opt = getopt(argc, argv, "t:m:i:r:I:T:P:c:Rb:")) != -1) {
     switch (opt) {
       case 't':
         header->num_thread = atoi(optarg);
@@ -71,6 +72,16 @@ int parse_arg(int argc, char*argv[], header_t* header) {
       case 'R':
         header->random = true;
         break;
+      case 'b':
+        if (strcmp(optarg, "u32") == 0) {
+          header->out_format = OUT_U32;
+        } else if (strcmp(optarg, "f32") == 0) {
+          header->out_format = OUT_F32;
+        } else {
+          fprintf(stderr, "ERROR -b takes u32 or f32\n");
+          return -1;
+        }
+        break;
     }
   }
   return 0;
@@ -81,6 +81,36 @@ typedef enum types {
   WR_BW,
 } types_t;
 
+// Latency output: decimal text lines (default) or raw samples after a bin_header_t
+typedef enum out_formats {
+  OUT_TEXT,
+  OUT_U32,
+  OUT_F32,
+} out_format_t;
+
+#define BIN_MAGIC     "MIOLAT\0\0"
+#define BIN_VERSION   1
+
+// Self-describing header of the binary output (-b), 80 bytes, little-endian
+typedef struct __attribute__((packed)) bin_header_struct {
+  char magic[8];          // BIN_MAGIC
+  uint32_t version;       // BIN_VERSION
+  uint32_t header_size;   // sizeof(bin_header_t), samples start here
+  uint32_t dtype;         // OUT_U32 or OUT_F32
+  int32_t node;           // -r, NUMA node of the chased buffer
+  uint32_t threads;       // -t
+  uint32_t mode;          // -T, types_t
+  uint64_t interval;      // -I, accesses averaged per sample
+  double tsc_ghz;         // TSC_FREQ_GHZ used to convert cycles to ns
+  uint64_t count;         // number of samples
+  uint32_t iterations;    // -i
+  int32_t starting_core;  // -c
+  uint8_t random;         // -R
+  uint8_t reserved[15];
+} bin_header_t;
+
+_Static_assert(sizeof(bin_header_t) == 80, "bin_header_t must be 80 bytes");
+
 typedef struct chase_struct chase_t;
 
 struct chase_struct {
@@ -90,6 +120,7 @@ struct chase_struct {
 
 typedef struct header_struct {
   int print;
+  out_format_t out_format;
   uint64_t num_thread; // number of threads
   uint64_t total_buf_size; // buffer size
   int buf_a_numa_node; // which numa node for buffer
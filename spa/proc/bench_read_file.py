@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the perf-stat parser in update_data.py.
+
+Writes synthetic L*.data files (same layout as `perf stat -o`) into a temp
+folder and reports lines per second for the legacy csv/events scan and the
+single-pass parser (update_data.read_counters). The .time/.mem/.output/.sysinfo
+pass that update_data.read_file adds on top is not part of either timing.
+
+  python3 spa/proc/bench_read_file.py --files 2000 --repeats 3
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, List
+
+try:
+    import spa.proc.update_data as u
+except ImportError:  # allow running as plain script
+    import sys
+
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    import spa.proc.update_data as u
+
+
+def legacy_read_file(file, workload_id, workload_name, mem_type):
+    # Verbatim copy of the original csv.reader + `e in processed_row` scan
+    res = OrderedDict()
+    res["workload_id"] = workload_id
+    res["workload_name"] = workload_name
+    res["mem_type"] = mem_type
+    with open(file) as csv_file:
+        had_not_counted = False
+        for row in csv.reader(csv_file, delimiter=" "):
+            processed_row = [item for item in row if item]
+            if "<not" in processed_row and "counted>" in processed_row:
+                had_not_counted = True
+                continue
+            for e in u.events:
+                if e in processed_row:
+                    res[e] = float(processed_row[0].replace(",", ""))
+    if had_not_counted:
+        res["__had_not_counted__"] = True
+    return res
+
+
+def synth_data(i: int) -> str:
+    lines = [
+        "# started on Sun Nov  9 06:10:20 2025",
+        "",
+        "",
+        " Performance counter stats for 'numactl --cpunodebind 0 --membind 1 -- bash cmd.sh':",
+        "",
+    ]
+    for j, e in enumerate(u.events):
+        if e == "time":
+            continue
+        if (i + j) % 97 == 0:
+            lines.append(f"   <not counted>      {e:<60}(0.00%)")
+            continue
+        value = f"{(i + 1) * 1_000_003 * (j + 7):,}"
+        lines.append(f"{value:>18}      {e:<60}({25 + (i + j) % 15}.{j:02d}%)")
+    lines += [
+        "",
+        f"     {100 + i % 900}.116092501 seconds time elapsed",
+        "",
+        f"    {5000 + i}.382116000 seconds user",
+        f"      {50 + i % 10}.325064000 seconds sys",
+        "",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def bench(parse: Callable, files: List[Path], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for f in files:
+            parse(str(f), f.parent.name + "..NUMA", f.parent.name, "NUMA")
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark perf stat .data parsing")
+    p.add_argument("--files", type=int, default=2000, help="Number of synthetic .data files")
+    p.add_argument("--repeats", type=int, default=3, help="Best-of-N timing")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        n_lines = 0
+        for i in range(args.files):
+            d = Path(tmp) / f"w{i:05d}"
+            d.mkdir()
+            f = d / "L0-1.data"
+            text = synth_data(i)
+            f.write_text(text)
+            n_lines += text.count("\n") + 1
+            files.append(f)
+
+        for f in files[:50]:
+            old = legacy_read_file(str(f), "x", "x", "NUMA")
+            new = u.read_counters(str(f), "x", "x", "NUMA")
+            assert old == new, f"parser mismatch on {f}"
+
+        t_old = bench(legacy_read_file, files, args.repeats)
+        t_new = bench(u.read_counters, files, args.repeats)
+
+    print(f"{args.files} files, {n_lines} lines")
+    print(f"  legacy csv scan : {n_lines / t_old:12,.0f} lines/s  ({t_old * 1e3:.1f} ms)")
+    print(f"  single pass     : {n_lines / t_new:12,.0f} lines/s  ({t_new * 1e3:.1f} ms)")
+    print(f"  speedup         : {t_old / t_new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
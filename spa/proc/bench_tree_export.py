@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for model.npz prediction (tree_export.CompiledTrees).
+
+Fits the default learner (learners.make_learner, 400 trees of depth 3) on
+synthetic data, exports it and reports rows per second for sklearn's predict
+and CompiledTrees.predict on the same rows, plus the single-row latency that
+ts_monitor.py pays per interval. Predictions are checked to agree first.
+
+  python3 spa/proc/bench_tree_export.py --rows 200000 --repeats 3
+"""
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+try:
+    from spa.proc.learners import make_learner
+    from spa.proc.tree_export import CompiledTrees, export_trees
+except ImportError:  # allow running as plain script
+    import sys
+
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from spa.proc.learners import make_learner
+    from spa.proc.tree_export import CompiledTrees, export_trees
+
+
+def bench(predict: Callable, X: np.ndarray, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        predict(X)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark model.npz prediction against sklearn")
+    p.add_argument("--learner", default="gbr", help="gbr or hgb")
+    p.add_argument("--features", type=int, default=37, help="Number of synthetic features")
+    p.add_argument("--train", type=int, default=2000, help="Training rows")
+    p.add_argument("--rows", type=int, default=200_000, help="Rows to predict")
+    p.add_argument("--repeats", type=int, default=3, help="Best-of-N timing")
+    args = p.parse_args()
+
+    rng = np.random.default_rng(0)
+    w = rng.normal(size=args.features)
+    X_train = rng.normal(size=(args.train, args.features))
+    y = X_train @ w + np.sin(3 * X_train[:, 0]) + rng.normal(scale=0.1, size=args.train)
+    model = make_learner(args.learner).fit(X_train, y)
+    X = rng.normal(size=(args.rows, args.features))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = export_trees(model, [f"x{i}" for i in range(args.features)], Path(tmp) / "model.npz")
+        t0 = time.perf_counter()
+        compiled = CompiledTrees.load(path)
+        t_load = time.perf_counter() - t0
+
+    err = np.abs(compiled.predict(X[:10_000]) - model.predict(X[:10_000])).max()
+    assert err < 1e-9, f"prediction mismatch: {err}"
+
+    t_sk = bench(model.predict, X, args.repeats)
+    t_np = bench(compiled.predict, X, args.repeats)
+    row = X[:1]
+    t_sk1 = bench(model.predict, row, 20 * args.repeats)
+    t_np1 = bench(compiled.predict, row, 20 * args.repeats)
+
+    print(f"{args.learner}: {compiled.n_trees} trees, {args.features} features, {args.rows} rows")
+    print(f"  sklearn predict : {args.rows / t_sk:12,.0f} rows/s  ({t_sk * 1e3:.1f} ms, 1 row {t_sk1 * 1e3:.3f} ms)")
+    print(f"  model.npz       : {args.rows / t_np:12,.0f} rows/s  ({t_np * 1e3:.1f} ms, 1 row {t_np1 * 1e3:.3f} ms)")
+    print(f"  speedup         : {t_sk / t_np:.2f}x  (load {t_load * 1e3:.1f} ms, max |diff| {err:.1e})")
+
+
+if __name__ == "__main__":
+    main()
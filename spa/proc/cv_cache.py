@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of out-of-fold predictions, shared by train_from_multi_rst.py
+and feature_ablation_pro.py.
+
+Entries are addressed by a hash of everything that determines the result:
+feature names and values, target, CV splitter, estimator class and params and
+the sklearn version. A rerun with the same (subset, model, data) loads the
+predictions instead of refitting. The folder is capped in size; the least
+recently used entries are removed first.
+
+Both scripts store the same payload, the OOF predictions (`preds`), so an
+entry written by one is a valid hit for the other.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path("spa/proc/out/cv_cache")
+CACHE_MAX_MB = 512
+# Bump when the stored layout or the meaning of a key changes
+CACHE_VERSION = 1
+
+
+def estimator_signature(model) -> str:
+    params = sorted((k, repr(v)) for k, v in model.get_params(deep=True).items())
+    return f"{type(model).__module__}.{type(model).__name__}{params}"
+
+
+def cv_key(X: pd.DataFrame, y: pd.Series, cv, model, groups=None) -> str:
+    """Content hash of one cross-validation run (groups feed grouped splitters)."""
+    import sklearn
+
+    h = hashlib.sha1()
+    h.update(f"v{CACHE_VERSION}|sklearn {sklearn.__version__}|{cv!r}|{estimator_signature(model)}".encode())
+    h.update("\x1f".join(map(str, X.columns)).encode())
+    h.update(np.ascontiguousarray(X.to_numpy(dtype=np.float64)).tobytes())
+    h.update(np.ascontiguousarray(np.asarray(y, dtype=np.float64)).tobytes())
+    if groups is not None:
+        h.update(("groups\x1f" + "\x1f".join(map(str, groups))).encode())
+    return h.hexdigest()
+
+
+class CVCache:
+    """Content-addressed .npz store of OOF arrays with LRU eviction by file mtime."""
+
+    def __init__(self, root: Path = CACHE_DIR, max_mb: float = CACHE_MAX_MB):
+        self.root = Path(root)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[Dict[str, np.ndarray]]:
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {k: data[k] for k in data.files}
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        # Mark as recently used
+        os.utime(path)
+        self.hits += 1
+        return arrays
+
+    def put(self, key: str, **arrays: np.ndarray) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so parallel runs never read a partial file; the .tmp suffix keeps
+        # in-flight files out of evict's *.npz scan
+        tmp = path.with_name(f".{path.stem}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total = 0
+        for p in self.root.glob("*/*.npz"):
+            try:
+                st = p.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime_ns, st.st_size, p))
+            total += st.st_size
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            p.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for p in self.root.glob("*/*.npz"):
+            p.unlink(missing_ok=True)
+
+    def summary(self) -> str:
+        return f"CV cache {self.root}: {self.hits} hits, {self.misses} misses"
+
+
+def open_cache(root: Optional[Path], max_mb: float = CACHE_MAX_MB) -> Optional[CVCache]:
+    """CVCache for a --cv-cache argument; None disables caching."""
+    if root is None:
+        return None
+    return CVCache(root, max_mb)
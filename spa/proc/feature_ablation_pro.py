@@ -3,9 +3,12 @@
 Parallel, more precise feature ablation and forward selection.
 
 Improvements over feature_ablation.py:
-- Parallel evaluation for single-feature, drop-one, and forward-selection steps
+- Parallel evaluation for single-feature, drop-one, and forward-selection steps:
+  every (feature subset, fold) fit is one job on a single persistent worker pool
 - Configurable CV: Leave-One-Out or Repeated K-Fold
-- Optional permutation importance (aggregated across CV folds)
+- Forward selection either greedy over all folds or raced (successive halving)
+- Optional permutation importance (aggregated across CV folds), by default
+  from fold models fit once and reused for every shuffled column
 
 Outputs:
 - JSON summary (baseline + top-k lists + forward path + optional permutation importance)
@@ -16,6 +19,8 @@ from __future__ import annotations
 import argparse
 import json
 import math
+import shutil
+import tempfile
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, List, Optional, Sequence, Tuple
@@ -24,18 +29,23 @@ import numpy as np
 import pandas as pd
 from joblib import Parallel, delayed
 from sklearn.base import clone
-from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import LeaveOneOut, RepeatedKFold
 
 try:
     from spa.proc.model_utils import load_dataset
+    from spa.proc.learners import (DEFAULT_LEARNER, LEARNERS, has_analytic_loo, load_params, make_learner,
+                                   share_matrix)
+    from spa.proc.cv_cache import CACHE_DIR, CACHE_MAX_MB, CVCache, cv_key, open_cache
 except ImportError:  # allow running as plain script
     import sys
     from pathlib import Path
 
     sys.path.append(str(Path(__file__).resolve().parents[2]))
     from spa.proc.model_utils import load_dataset
+    from spa.proc.learners import (DEFAULT_LEARNER, LEARNERS, has_analytic_loo, load_params, make_learner,
+                                   share_matrix)
+    from spa.proc.cv_cache import CACHE_DIR, CACHE_MAX_MB, CVCache, cv_key, open_cache
 
 
 @dataclass
@@ -59,56 +69,263 @@ def build_cv(cv_kind: str, n_splits: int, n_repeats: int, random_state: int, n_s
     raise ValueError(f"Unsupported cv '{cv_kind}'. Use 'loo' or 'rkf'.")
 
 
-def evaluate_oof(model, X: pd.DataFrame, y: pd.Series, cv, n_jobs: int) -> Tuple[Metrics, np.ndarray]:
-    # Run folds in parallel; aggregate OOF preds
-    indices = np.arange(len(X))
+def evaluate_oof(model, X: pd.DataFrame, y: pd.Series, cv, n_jobs: int,
+                 cache: Optional[CVCache] = None) -> Tuple[Metrics, np.ndarray]:
+    # One-off OOF evaluation of all columns of X
+    with SubsetScheduler(model, X, y, cv, n_jobs, cache) as sched:
+        return sched.evaluate([list(X.columns)])[0]
 
-    def _run_fold(train_idx, test_idx):
-        m = clone(model)
-        m.fit(X.iloc[train_idx], y.iloc[train_idx])
-        pred = m.predict(X.iloc[test_idx])
-        return test_idx, pred
-
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(_run_fold)(train_idx, test_idx) for train_idx, test_idx in cv.split(X, y)
-    )
-    # Some CV splitters (RepeatedKFold) predict each sample multiple times; average them
-    preds = np.zeros(len(X), dtype=float)
-    counts = np.zeros(len(X), dtype=int)
-    for test_idx, pred in results:
-        preds[test_idx] += pred
-        counts[test_idx] += 1
-    # Avoid div-by-zero when some samples unseen (shouldn't happen for LOO or RKF)
-    counts[counts == 0] = 1
-    preds = preds / counts
 
+def _metrics(y: pd.Series, preds: np.ndarray) -> Metrics:
     mae = mean_absolute_error(y, preds)
     rmse = float(np.sqrt(mean_squared_error(y, preds)))
     mape = float(np.mean(np.abs((y - preds) / np.clip(np.abs(y), 1e-9, None))))
     r2 = r2_score(y, preds)
-    return Metrics(mae, rmse, mape, r2), preds
-
-
-def permutation_importance_cv(model, X: pd.DataFrame, y: pd.Series, cv, n_repeats: int, n_jobs: int) -> Dict[str, float]:
-    # Simple, CV-averaged permutation importance using MAE degradation
-    rng = np.random.RandomState(42)
-    base_metrics, base_oof = evaluate_oof(model, X, y, cv, n_jobs)
-    base_mae = base_metrics.mae
-
-    def _perm_feat(col: str) -> Tuple[str, float]:
-        deltas: List[float] = []
-        for _ in range(n_repeats):
-            Xp = X.copy()
-            # permute column values consistently across rows
-            Xp[col] = rng.permutation(Xp[col].values)
-            m, _ = evaluate_oof(model, Xp, y, cv, n_jobs)
-            deltas.append(m.mae - base_mae)
-        return col, float(np.mean(deltas))
-
-    results = Parallel(n_jobs=n_jobs, backend="loky")(
-        delayed(_perm_feat)(c) for c in X.columns
+    return Metrics(mae, rmse, mape, r2)
+
+
+# Worker functions get the shared read-only matrix (an np.memmap, which joblib
+# passes by file reference) and integer column positions, and copy out only the
+# rows/columns one fit needs. An optional (perm, perm_col) replaces column
+# perm_col of the subset by its values at the permuted rows.
+def _take(Xv: np.ndarray, rows, col_pos: np.ndarray, perm=None, perm_col=None) -> np.ndarray:
+    block = Xv[np.ix_(rows, col_pos)]
+    if perm is not None:
+        block[:, perm_col] = Xv[perm[rows], col_pos[perm_col]]
+    return block
+
+
+def _fit_predict(model, Xv: np.ndarray, yv: np.ndarray, col_pos: np.ndarray, train_idx, test_idx,
+                 perm=None, perm_col=None):
+    m = clone(model)
+    m.fit(_take(Xv, train_idx, col_pos, perm, perm_col), yv[train_idx])
+    return m.predict(_take(Xv, test_idx, col_pos, perm, perm_col))
+
+
+def _analytic_loo(model, Xv: np.ndarray, yv: np.ndarray, col_pos: np.ndarray, perm=None, perm_col=None):
+    return clone(model).loo_predict(_take(Xv, np.arange(len(yv)), col_pos, perm, perm_col), yv)
+
+
+def _fit_model(model, Xv: np.ndarray, yv: np.ndarray, col_pos: np.ndarray, train_idx):
+    return clone(model).fit(Xv[np.ix_(train_idx, col_pos)], yv[train_idx])
+
+
+def _predict_permuted(m, Xv: np.ndarray, test_idx, perms: np.ndarray, col_pos: np.ndarray) -> np.ndarray:
+    # Stack one copy of the test rows per (feature, repeat) with that feature's column
+    # replaced by its permuted values, so every permutation costs a single predict call.
+    block = np.repeat(Xv[test_idx][None, :, :], len(perms), axis=0)
+    block[np.arange(len(perms))[:, None], np.arange(len(test_idx))[None, :], col_pos[:, None]] = \
+        Xv[perms[:, test_idx], col_pos[:, None]]
+    return m.predict(block.reshape(-1, Xv.shape[1])).reshape(len(perms), len(test_idx))
+
+
+# (column positions, row permutation or None, position in the subset of the permuted column)
+Variant = Tuple[np.ndarray, Optional[np.ndarray], Optional[int]]
+
+
+class SubsetScheduler:
+    """
+    Evaluates many feature subsets at once: every (subset, fold) fit becomes one
+    job in a single flat batch on a persistent loky pool, and the fold
+    predictions are reduced per subset afterwards. Avoids nesting a fold-level
+    Parallel inside a feature-level one. Use as a context manager so the pool
+    is kept across batches and the shared matrix is removed afterwards.
+
+    X is written once to a contiguous float64 memmap that all workers map
+    read-only; tasks carry only column positions and fold indices.
+    """
+
+    def __init__(self, model, X: pd.DataFrame, y: pd.Series, cv, n_jobs: int, cache: Optional[CVCache] = None):
+        self.model = model
+        self.X = X
+        self.y = y
+        self.cv = cv
+        self.cache = cache
+        self.folds = list(cv.split(X, y))
+        self.analytic = isinstance(cv, LeaveOneOut) and has_analytic_loo(model)
+        self.parallel = Parallel(n_jobs=n_jobs, backend="loky")
+        self.col_index = {c: i for i, c in enumerate(X.columns)}
+        self._tmpdir = tempfile.mkdtemp(prefix="spa_ablation_")
+        self.Xv = share_matrix(X, self._tmpdir)
+        self.yv = y.to_numpy(dtype=np.float64)
+
+    def __enter__(self) -> "SubsetScheduler":
+        self.parallel.__enter__()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.parallel.__exit__(*exc)
+        self.close()
+
+    def close(self) -> None:
+        self.Xv = None
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def positions(self, cols: Sequence[str]) -> np.ndarray:
+        return np.array([self.col_index[c] for c in cols], dtype=np.intp)
+
+    def evaluate(self, subsets: Sequence[Sequence[str]]) -> List[Tuple[Metrics, np.ndarray]]:
+        """OOF metrics and predictions of every subset, in input order."""
+        return self._evaluate_cached([(self.positions(cols), None, None) for cols in subsets])
+
+    def evaluate_permuted(self, cols: Sequence[str], perms: Sequence[Tuple[str, np.ndarray]]
+                          ) -> List[Tuple[Metrics, np.ndarray]]:
+        """OOF results of `cols` refit with one column shuffled, per (column, row permutation)."""
+        pos = self.positions(cols)
+        local = {c: i for i, c in enumerate(cols)}
+        return self._evaluate_cached([(pos, perm, local[c]) for c, perm in perms])
+
+    def _frame(self, variant: Variant) -> pd.DataFrame:
+        col_pos, perm, perm_col = variant
+        frame = self.X.iloc[:, col_pos]
+        if perm is not None:
+            frame = frame.copy()
+            frame.iloc[:, perm_col] = frame.iloc[:, perm_col].to_numpy()[perm]
+        return frame
+
+    def _evaluate_cached(self, variants: List[Variant]) -> List[Tuple[Metrics, np.ndarray]]:
+        if self.cache is None:
+            return self._evaluate(variants)
+        # Only variants missing from the cache are fit; the rest load their OOF predictions
+        keys = [cv_key(self._frame(v), self.y, self.cv, self.model) for v in variants]
+        results: List[Optional[Tuple[Metrics, np.ndarray]]] = [None] * len(variants)
+        for i, key in enumerate(keys):
+            hit = self.cache.get(key)
+            if hit is not None and "preds" in hit:
+                results[i] = (_metrics(self.y, hit["preds"]), hit["preds"])
+        todo = [i for i, r in enumerate(results) if r is None]
+        for i, res in zip(todo, self._evaluate([variants[i] for i in todo])):
+            self.cache.put(keys[i], preds=res[1])
+            results[i] = res
+        return results
+
+    def _evaluate(self, variants: List[Variant]) -> List[Tuple[Metrics, np.ndarray]]:
+        if not variants:
+            return []
+        if self.analytic:
+            # One fit per subset already gives the exact LOO predictions
+            results = self.parallel(delayed(_analytic_loo)(self.model, self.Xv, self.yv, *v) for v in variants)
+            return [(_metrics(self.y, preds), preds) for preds in results]
+        all_folds = range(len(self.folds))
+        return [self.reduce(fp) for fp in self._fold_predictions(variants, all_folds)]
+
+    def fold_predictions(self, subsets: Sequence[Sequence[str]], fold_ids: Sequence[int]) -> List[Dict[int, np.ndarray]]:
+        """Held-out predictions of every subset on the given folds, as {fold id: preds}."""
+        return self._fold_predictions([(self.positions(cols), None, None) for cols in subsets], fold_ids)
+
+    def _fold_predictions(self, variants: List[Variant], fold_ids: Sequence[int]) -> List[Dict[int, np.ndarray]]:
+        jobs = [(i, k) for i in range(len(variants)) for k in fold_ids]
+        results = self.parallel(
+            delayed(_fit_predict)(self.model, self.Xv, self.yv, variants[i][0], *self.folds[k], *variants[i][1:])
+            for i, k in jobs
+        )
+        out: List[Dict[int, np.ndarray]] = [{} for _ in variants]
+        for (i, k), pred in zip(jobs, results):
+            out[i][k] = pred
+        return out
+
+    def reduce(self, fold_preds: Dict[int, np.ndarray]) -> Tuple[Metrics, np.ndarray]:
+        """
+        Metrics over the rows the given folds predicted. Some CV splitters
+        (RepeatedKFold) predict each sample multiple times; those are averaged.
+        """
+        preds = np.zeros(len(self.X), dtype=float)
+        counts = np.zeros(len(self.X), dtype=int)
+        for k in sorted(fold_preds):
+            te = self.folds[k][1]
+            preds[te] += fold_preds[k]
+            counts[te] += 1
+        seen = counts > 0
+        if seen.all():
+            return _metrics(self.y, preds / counts), preds / counts
+        preds = preds[seen] / counts[seen]
+        return _metrics(self.y[seen], preds), preds
+
+
+def race_candidates(sched: SubsetScheduler, selected: List[str], candidates: List[str], eta: int = 3,
+                    min_folds: Optional[int] = None, seed: int = 42) -> Tuple[str, Metrics, int]:
+    """
+    Successive halving over forward-selection candidates: score all of them on a
+    few folds, keep the best 1/eta by MAE, give the survivors eta times more folds
+    and repeat until the survivors have run on every fold. Fold predictions are
+    cached, so a survivor only fits the folds it has not seen yet. Returns the
+    winner, its metrics on all folds and the number of fits spent.
+    """
+    n_folds = len(sched.folds)
+    # Random fold order so a prefix is a fair sample (LOO folds come sorted by row)
+    order = np.random.RandomState(seed).permutation(n_folds)
+    budget = min_folds or max(1, math.ceil(n_folds / eta ** 2))
+    alive = list(candidates)
+    cache: Dict[str, Dict[int, np.ndarray]] = {f: {} for f in alive}
+    n_fits = 0
+    while True:
+        budget = min(budget, n_folds)
+        folds = [int(k) for k in order[:budget]]
+        # Survivors all ran the same fold prefix; fit only the new folds
+        new_folds = folds[len(cache[alive[0]]):]
+        if new_folds:
+            for f, fp in zip(alive, sched.fold_predictions([selected + [f] for f in alive], new_folds)):
+                cache[f].update(fp)
+                n_fits += len(fp)
+        scores = {f: sched.reduce(cache[f])[0] for f in alive}
+        if budget >= n_folds:
+            best = min(alive, key=lambda f: scores[f].mae)
+            return best, scores[best], n_fits
+        keep = max(1, math.ceil(len(alive) / eta))
+        alive = sorted(alive, key=lambda f: scores[f].mae)[:keep]
+        budget *= eta
+
+
+def permutation_importance_cached(sched: SubsetScheduler, n_repeats: int, seed: int = 42) -> Dict[str, float]:
+    """
+    MAE increase when one feature's column is shuffled, averaged over repeats.
+    Each fold model is fit once on all features; a shuffled column only changes
+    what the cached models predict for their held-out rows, so the cost is
+    predictions, not refits.
+    """
+    cols = list(sched.X.columns)
+    n = len(sched.yv)
+    rng = np.random.RandomState(seed)
+    # Row permutation per (feature, repeat); the same shuffled column is used by every fold
+    perms = np.stack([rng.permutation(n) for _ in range(len(cols) * n_repeats)])
+    col_pos = np.repeat(np.arange(len(cols)), n_repeats)
+    all_pos = sched.positions(cols)
+
+    models = sched.parallel(
+        delayed(_fit_model)(sched.model, sched.Xv, sched.yv, all_pos, tr) for tr, _ in sched.folds
+    )
+    results = sched.parallel(
+        delayed(_predict_permuted)(m, sched.Xv, te, perms, col_pos) for m, (_, te) in zip(models, sched.folds)
     )
-    return {k: v for k, v in results}
+    base = np.zeros(n)
+    preds = np.zeros((len(perms), n))
+    counts = np.zeros(n, dtype=int)
+    for m, (_, te), pred in zip(models, sched.folds, results):
+        base[te] += m.predict(sched.Xv[te])
+        preds[:, te] += pred
+        counts[te] += 1
+    counts[counts == 0] = 1
+    base_mae = mean_absolute_error(sched.yv, base / counts)
+    maes = np.abs((preds / counts) - sched.yv[None, :]).mean(axis=1)
+    deltas = (maes - base_mae).reshape(len(cols), n_repeats).mean(axis=1)
+    return {c: float(d) for c, d in zip(cols, deltas)}
+
+
+def permutation_importance_cv(sched: SubsetScheduler, n_repeats: int, seed: int = 42) -> Dict[str, float]:
+    """
+    CV-averaged permutation importance using MAE degradation, refitting every
+    fold per shuffle. All (feature, repeat, fold) fits go out as one batch.
+    """
+    cols = list(sched.X.columns)
+    base_metrics, _ = sched.evaluate([cols])[0]
+    perms = []
+    for col in cols:
+        # Every feature draws from a fresh seeded stream (as the old per-feature tasks did)
+        rng = np.random.RandomState(seed)
+        perms += [(col, rng.permutation(len(sched.yv))) for _ in range(n_repeats)]
+    results = sched.evaluate_permuted(cols, perms)
+    deltas = np.array([m.mae - base_metrics.mae for m, _ in results]).reshape(len(cols), n_repeats)
+    return {c: float(d) for c, d in zip(cols, deltas.mean(axis=1))}
 
 
 def parse_args() -> argparse.Namespace:
@@ -118,9 +335,31 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--cv", choices=["loo", "rkf"], default="loo")
     p.add_argument("--rkf-splits", type=int, default=5)
     p.add_argument("--rkf-repeats", type=int, default=10)
+    p.add_argument("--model", choices=sorted(LEARNERS), default=DEFAULT_LEARNER,
+                   help="Learner from spa/proc/learners.py (ridge uses the analytic LOO)")
+    p.add_argument("--params-file", type=Path, default=None,
+                   help="Learner and hyperparameters written by tune_gbr.py (overrides --model)")
     p.add_argument("--n-jobs", type=int, default=-1, help="Parallel workers (-1 for all cores)")
-    p.add_argument("--perm-importance", action="store_true", help="Compute permutation importance (slow)")
+    p.add_argument(
+        "--forward-mode",
+        choices=["greedy", "racing"],
+        default="greedy",
+        help="greedy: every candidate on all folds; racing: successive halving over folds per step",
+    )
+    p.add_argument("--race-eta", type=int, default=3, help="Racing: keep 1/eta of candidates, eta x folds per round")
+    p.add_argument("--race-min-folds", type=int, default=None,
+                   help="Racing: folds in the first round (default n_folds / eta^2)")
+    p.add_argument("--cv-cache", type=Path, default=CACHE_DIR, help="Folder of cached out-of-fold predictions")
+    p.add_argument("--no-cv-cache", action="store_true", help="Always refit, do not read or write --cv-cache")
+    p.add_argument("--cv-cache-mb", type=float, default=CACHE_MAX_MB, help="Size cap of --cv-cache (LRU eviction)")
+    p.add_argument("--perm-importance", action="store_true", help="Compute permutation importance")
     p.add_argument("--perm-repeats", type=int, default=10)
+    p.add_argument(
+        "--perm-mode",
+        choices=["cached", "refit"],
+        default="cached",
+        help="cached: fit each fold once and shuffle only what it predicts; refit: retrain every fold per shuffle (slow)",
+    )
     p.add_argument("--out-json", type=Path, default=Path("spa/proc/ablation_pro.json"))
     p.add_argument("--out-csv", type=Path, default=Path("spa/proc/ablation_pro.csv"))
     return p.parse_args()
@@ -130,77 +369,69 @@ def main() -> None:
     args = parse_args()
     X, y = load_dataset(args.dataset, feature_mode=args.feature_mode)
 
-    model = GradientBoostingRegressor(
-        loss="squared_error",
-        learning_rate=0.05,
-        n_estimators=600,           # slightly larger for stability
-        max_depth=3,
-        min_samples_leaf=2,
-        random_state=42,
-        subsample=0.9,
-    )
+    if args.params_file:
+        args.model, params = load_params(args.params_file)
+        print(f"[INFO] {args.model} params from {args.params_file}: {params}")
+    else:
+        # Slightly more trees than training for stable rankings (ignored by ridge)
+        params = {"n_estimators": 600}
+    model = make_learner(args.model, **params)
 
     cv = build_cv(args.cv, args.rkf_splits, args.rkf_repeats, 42, len(X))
 
-    # Baseline
-    baseline, base_oof = evaluate_oof(model, X, y, cv, args.n_jobs)
-
-    # Single-feature (parallel over features)
-    def _eval_single(col: str):
-        m, _ = evaluate_oof(model, X[[col]], y, cv, args.n_jobs)
-        return {"feature": col, **m.to_dict()}
-
-    single_rows = Parallel(n_jobs=args.n_jobs, backend="loky")(
-        delayed(_eval_single)(c) for c in X.columns
-    )
-
-    # Drop-one (parallel over features)
-    def _eval_drop(col: str):
-        remain = [c for c in X.columns if c != col]
-        m, _ = evaluate_oof(model, X[remain], y, cv, args.n_jobs)
-        return {
-            "dropped_feature": col,
-            **m.to_dict(),
-            "delta_mae": m.mae - baseline.mae,
-            "delta_rmse": m.rmse - baseline.rmse,
-            "delta_r2": m.r2 - baseline.r2,
-        }
-
-    drop_rows = Parallel(n_jobs=args.n_jobs, backend="loky")(
-        delayed(_eval_drop)(c) for c in X.columns
-    )
-
-    # Greedy forward selection (parallel per step over remaining candidates)
-    remaining = list(X.columns)
-    selected: List[str] = []
-    forward_path: List[Dict] = []
-    current_best_mae = math.inf
-    while remaining:
-        candidates = remaining.copy()
-
-        def _eval_with(feat: str):
-            cols = selected + [feat]
-            m, _ = evaluate_oof(model, X[cols], y, cv, args.n_jobs)
-            return feat, m
-
-        results = Parallel(n_jobs=args.n_jobs, backend="loky")(
-            delayed(_eval_with)(f) for f in candidates
-        )
-        # pick best by MAE
-        best_feat, best_metrics = min(results, key=lambda t: t[1].mae)
-        selected.append(best_feat)
-        remaining.remove(best_feat)
-        forward_path.append({"k": len(selected), "added": best_feat, "features": list(selected), **best_metrics.to_dict()})
-
-        # Early stop if improvement is negligible
-        if current_best_mae - best_metrics.mae < 1e-4:
-            break
-        current_best_mae = best_metrics.mae
-
-    # Optional permutation importance (slow)
-    perm_importances = None
-    if args.perm_importance:
-        perm_importances = permutation_importance_cv(model, X, y, cv, args.perm_repeats, args.n_jobs)
+    cache = open_cache(None if args.no_cv_cache else args.cv_cache, args.cv_cache_mb)
+    with SubsetScheduler(model, X, y, cv, args.n_jobs, cache) as sched:
+        # Baseline, single-feature and drop-one subsets go out as one flat batch
+        cols_all = list(X.columns)
+        subsets = [cols_all] + [[c] for c in cols_all] + [[c for c in cols_all if c != col] for col in cols_all]
+        results = sched.evaluate(subsets)
+        baseline, base_oof = results[0]
+        single_results = results[1 : 1 + len(cols_all)]
+        drop_results = results[1 + len(cols_all) :]
+
+        single_rows = [{"feature": col, **m.to_dict()} for col, (m, _) in zip(cols_all, single_results)]
+        drop_rows = [
+            {
+                "dropped_feature": col,
+                **m.to_dict(),
+                "delta_mae": m.mae - baseline.mae,
+                "delta_rmse": m.rmse - baseline.rmse,
+                "delta_r2": m.r2 - baseline.r2,
+            }
+            for col, (m, _) in zip(cols_all, drop_results)
+        ]
+
+        # Forward selection (one batch of candidate x fold jobs per step, or a race over folds)
+        remaining = list(X.columns)
+        selected: List[str] = []
+        forward_path: List[Dict] = []
+        current_best_mae = math.inf
+        while remaining:
+            candidates = remaining.copy()
+            if args.forward_mode == "racing" and not sched.analytic:
+                best_feat, best_metrics, _ = race_candidates(
+                    sched, selected, candidates, args.race_eta, args.race_min_folds
+                )
+            else:
+                step = sched.evaluate([selected + [f] for f in candidates])
+                results = [(f, m) for f, (m, _) in zip(candidates, step)]
+                # pick best by MAE
+                best_feat, best_metrics = min(results, key=lambda t: t[1].mae)
+            selected.append(best_feat)
+            remaining.remove(best_feat)
+            forward_path.append({"k": len(selected), "added": best_feat, "features": list(selected), **best_metrics.to_dict()})
+
+            # Early stop if improvement is negligible
+            if current_best_mae - best_metrics.mae < 1e-4:
+                break
+            current_best_mae = best_metrics.mae
+
+        # Optional permutation importance
+        perm_importances = None
+        if args.perm_importance and args.perm_mode == "cached":
+            perm_importances = permutation_importance_cached(sched, args.perm_repeats)
+        elif args.perm_importance:
+            perm_importances = permutation_importance_cv(sched, args.perm_repeats)
 
     # Persist outputs
     args.out_json.parent.mkdir(parents=True, exist_ok=True)
@@ -209,14 +440,19 @@ def main() -> None:
             {
                 "dataset": str(args.dataset),
                 "feature_mode": args.feature_mode,
+                "learner": args.model,
+                "params_file": str(args.params_file) if args.params_file else None,
                 "cv": args.cv,
                 "rkf_splits": args.rkf_splits,
                 "rkf_repeats": args.rkf_repeats,
                 "n_jobs": args.n_jobs,
+                "forward_mode": args.forward_mode,
+                "race_eta": args.race_eta if args.forward_mode == "racing" else None,
                 "baseline": baseline.to_dict(),
                 "best_single": sorted(single_rows, key=lambda d: d["mae"])[:15],
                 "drop_importance": sorted(drop_rows, key=lambda d: d["delta_mae"], reverse=True)[:30],
                 "forward_path": forward_path,
+                "perm_mode": args.perm_mode if args.perm_importance else None,
                 "permutation_importance": perm_importances,
             },
             f,
@@ -230,6 +466,8 @@ def main() -> None:
     table.to_csv(args.out_csv, index=False)
 
     # Console summary
+    if cache is not None:
+        print(cache.summary())
     print("Baseline:")
     for k, v in baseline.to_dict().items():
         print(f"  {k}: {v:.4f}")
@@ -242,6 +480,10 @@ def main() -> None:
     print("\nForward selection (first 6 steps):")
     for step in forward_path[:6]:
         print(f"  k={step['k']}, +{step['added']}, mae={step['mae']:.4f}, r2={step['r2']:.3f}")
+    if perm_importances:
+        print(f"\nPermutation importance ({args.perm_mode}, top-5 by ΔMAE):")
+        for feat, delta in sorted(perm_importances.items(), key=lambda kv: kv[1], reverse=True)[:5]:
+            print(f"  {feat}: Δmae={delta:.4f}")
 
 
 if __name__ == "__main__":
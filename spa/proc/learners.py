@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Registry of slowdown learners shared by train_from_multi_rst.py and
+feature_ablation_pro.py, plus a LOO comparison of their accuracy and cost.
+
+  gbr    GradientBoostingRegressor (the original model)
+  hgb    HistGradientBoostingRegressor, binned features
+  ridge  standardized ridge regression; its leave-one-out predictions come
+         from the hat matrix of a single fit instead of n refits
+
+Compare them on datasets built by update_data / train_from_multi_rst:
+
+  python3 spa/proc/learners.py --dataset spa/proc/out/multi/combined --n-jobs -1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import LeaveOneOut
+
+try:
+    from spa.proc.model_utils import load_dataset
+    from spa.proc.cv_cache import CVCache, cv_key
+except ImportError:  # allow running as plain script
+    import sys
+
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from spa.proc.model_utils import load_dataset
+    from spa.proc.cv_cache import CVCache, cv_key
+
+DEFAULT_LEARNER = "gbr"
+# Written by tune_gbr.py, read by --params-file of the training/ablation scripts
+PARAMS_FILE = Path("spa/proc/out/gbr_params.json")
+
+
+class HatRidge(BaseEstimator, RegressorMixin):
+    """
+    Ridge regression on standardized features with an unpenalized intercept.
+
+    `loo_predict` returns exact leave-one-out predictions of this model for a
+    fixed standardization (mean/std of all rows, as RidgeCV does): with hat
+    matrix H, the LOO residual of row i is e_i / (1 - H_ii).
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+
+    def _standardize(self, X) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        X = np.asarray(X, dtype=float)
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        return (X - mean) / scale, mean, scale
+
+    def _solve(self, Z: np.ndarray, yc: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Ridge normal equations; returns (coef, (Z'Z + aI)^-1)
+        gram_inv = np.linalg.inv(Z.T @ Z + self.alpha * np.eye(Z.shape[1]))
+        return gram_inv @ (Z.T @ yc), gram_inv
+
+    def fit(self, X, y):
+        y = np.asarray(y, dtype=float)
+        Z, self.mean_, self.scale_ = self._standardize(X)
+        self.intercept_ = float(y.mean())
+        self.coef_, _ = self._solve(Z, y - self.intercept_)
+        self.n_features_in_ = Z.shape[1]
+        return self
+
+    def predict(self, X):
+        Z = (np.asarray(X, dtype=float) - self.mean_) / self.scale_
+        return Z @ self.coef_ + self.intercept_
+
+    def loo_predict(self, X, y) -> np.ndarray:
+        y = np.asarray(y, dtype=float)
+        Z, _, _ = self._standardize(X)
+        y_mean = y.mean()
+        coef, gram_inv = self._solve(Z, y - y_mean)
+        resid = y - (Z @ coef + y_mean)
+        # Diagonal of H = 11'/n + Z (Z'Z + aI)^-1 Z'
+        h = 1.0 / len(y) + np.einsum("ij,jk,ik->i", Z, gram_inv, Z)
+        return y - resid / (1.0 - h)
+
+
+def _gbr(**params) -> GradientBoostingRegressor:
+    base = dict(loss="squared_error", learning_rate=0.05, n_estimators=400, max_depth=3,
+                min_samples_leaf=2, random_state=42, subsample=0.9)
+    return GradientBoostingRegressor(**{**base, **params})
+
+
+def _hgb(**params) -> HistGradientBoostingRegressor:
+    base = dict(loss="squared_error", learning_rate=0.05, max_iter=400, max_depth=3,
+                min_samples_leaf=2, early_stopping=False, random_state=42)
+    # Same knob name as GBR so callers can size both the same way
+    if "n_estimators" in params:
+        params["max_iter"] = params.pop("n_estimators")
+    return HistGradientBoostingRegressor(**{**base, **params})
+
+
+def _ridge(**params) -> HatRidge:
+    params.pop("n_estimators", None)
+    return HatRidge(**params)
+
+
+LEARNERS: Dict[str, Callable[..., BaseEstimator]] = {
+    "gbr": _gbr,
+    "hgb": _hgb,
+    "ridge": _ridge,
+}
+
+
+def make_learner(name: str, **params) -> BaseEstimator:
+    """Build a learner from the registry; params override its defaults."""
+    if name not in LEARNERS:
+        raise ValueError(f"Unknown learner '{name}'. Use one of: {', '.join(LEARNERS)}")
+    return LEARNERS[name](**params)
+
+
+def load_params(path: Path) -> Tuple[str, Dict]:
+    """(learner name, params) from a tune_gbr.py params file."""
+    data = json.loads(Path(path).read_text())
+    name = data.get("learner", DEFAULT_LEARNER)
+    if name not in LEARNERS:
+        raise ValueError(f"{path}: unknown learner '{name}'")
+    return name, dict(data.get("params", {}))
+
+
+def save_params(path: Path, name: str, params: Dict, **info) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"learner": name, "params": params, **info}, indent=2))
+
+
+def share_matrix(X: pd.DataFrame, folder: str) -> np.memmap:
+    """
+    Write X once to a contiguous float64 .npy in folder and map it read-only.
+    joblib hands the memmap to loky workers by file name instead of pickling it.
+    """
+    path = os.path.join(folder, "X.npy")
+    shared = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=X.shape)
+    shared[:] = X.to_numpy(dtype=np.float64)
+    shared.flush()
+    del shared
+    return np.load(path, mmap_mode="r")
+
+
+def has_analytic_loo(model) -> bool:
+    return hasattr(model, "loo_predict")
+
+
+def _fit_fold(model, X: pd.DataFrame, y: pd.Series, tr: np.ndarray, te: np.ndarray):
+    t0 = time.perf_counter()
+    m = clone(model).fit(X.iloc[tr], y.iloc[tr])
+    fit_seconds = time.perf_counter() - t0
+    return m.predict(X.iloc[te]), fit_seconds
+
+
+def loo_predict(model, X: pd.DataFrame, y: pd.Series, n_jobs: int = 1,
+                cache: Optional[CVCache] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Leave-one-out predictions and per-fold fit seconds. Learners with an
+    analytic LOO are fit once (its time is split evenly over the folds); the
+    rest spread their folds over n_jobs loky workers. Each fold clones the same
+    seeded model, so the predictions do not depend on n_jobs. With a cache, a
+    previous run on identical data/model is returned (fit seconds NaN, nothing was fit).
+    """
+    return cv_predict(model, X, y, LeaveOneOut(), n_jobs=n_jobs, cache=cache)
+
+
+def cv_predict(model, X: pd.DataFrame, y: pd.Series, cv, groups: Optional[np.ndarray] = None,
+               n_jobs: int = 1, cache: Optional[CVCache] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Out-of-fold predictions of any splitter whose test folds partition the rows
+    (LeaveOneOut, LeaveOneGroupOut, GroupKFold, ...), and for every row the fit
+    seconds of the fold that predicted it. Predictions loaded from the cache
+    come with NaN fit seconds.
+    """
+    key = None
+    if cache is not None:
+        key = cv_key(X, y, cv, model, groups)
+        hit = cache.get(key)
+        if hit is not None and "preds" in hit:
+            return hit["preds"], np.full(len(X), np.nan)
+    preds, fit_seconds = _cv_predict(model, X, y, cv, groups, n_jobs)
+    if cache is not None:
+        # Same payload as feature_ablation_pro.py stores under the same key
+        cache.put(key, preds=preds)
+    return preds, fit_seconds
+
+
+def _cv_predict(model, X: pd.DataFrame, y: pd.Series, cv, groups, n_jobs: int) -> Tuple[np.ndarray, np.ndarray]:
+    if isinstance(cv, LeaveOneOut) and has_analytic_loo(model):
+        t0 = time.perf_counter()
+        preds = clone(model).loo_predict(X, y)
+        return preds, np.full(len(X), (time.perf_counter() - t0) / len(X))
+
+    folds = list(cv.split(X, y, groups))
+    results = Parallel(n_jobs=n_jobs, backend="loky")(
+        delayed(_fit_fold)(model, X, y, tr, te) for tr, te in folds
+    )
+    preds = np.zeros(len(X))
+    fit_seconds = np.zeros(len(X))
+    for (_, te), (pred, secs) in zip(folds, results):
+        preds[te] = pred
+        fit_seconds[te] = secs
+    return preds, fit_seconds
+
+
+def regression_metrics(y, preds) -> Dict[str, float]:
+    mae = mean_absolute_error(y, preds)
+    rmse = float(np.sqrt(mean_squared_error(y, preds)))
+    mape = float(np.mean(np.abs((y - preds) / np.clip(np.abs(y), 1e-9, None))))
+    r2 = r2_score(y, preds)
+    return {"mae": mae, "rmse": rmse, "mape": mape, "r2": r2}
+
+
+def group_metrics(y: pd.Series, preds: np.ndarray, groups: np.ndarray) -> Dict[str, Dict[str, float]]:
+    """regression_metrics and row count of every group (R2 needs at least two rows)."""
+    y = np.asarray(y, dtype=float)
+    out = {}
+    for g in pd.unique(groups):
+        mask = groups == g
+        if mask.sum() > 1:
+            out[str(g)] = {**regression_metrics(y[mask], preds[mask]), "n": int(mask.sum())}
+        else:
+            out[str(g)] = {"mae": float(np.abs(y[mask] - preds[mask]).mean()), "n": 1}
+    return out
+
+
+def compare_learners(X: pd.DataFrame, y: pd.Series, names: List[str], n_jobs: int = 1) -> pd.DataFrame:
+    """LOO metrics and wall time of every learner in `names` on one dataset."""
+    rows = []
+    for name in names:
+        model = make_learner(name)
+        t0 = time.perf_counter()
+        preds, fit_seconds = loo_predict(model, X, y, n_jobs)
+        rows.append({"learner": name, **regression_metrics(y, preds),
+                     "wall_seconds": time.perf_counter() - t0, "fit_seconds": float(fit_seconds.sum())})
+    return pd.DataFrame(rows)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Compare slowdown learners by LOO accuracy and wall time")
+    p.add_argument("--dataset", type=Path, nargs="+", default=[Path("spa/proc/out/multi/combined")],
+                   help="Folders containing merged.csv")
+    p.add_argument("--feature-mode", choices=["minimal", "all"], default="all")
+    p.add_argument("--learners", type=str, default=",".join(LEARNERS), help="Comma-separated registry names")
+    p.add_argument("--n-jobs", type=int, default=-1, help="Parallel LOO folds (-1 for all cores)")
+    p.add_argument("--out-csv", type=Path, default=None)
+    args = p.parse_args()
+
+    names = [n.strip() for n in args.learners.split(",") if n.strip()]
+    tables = []
+    for ds in args.dataset:
+        X, y = load_dataset(ds, feature_mode=args.feature_mode)
+        print(f"{ds}: {len(X)} workloads, {X.shape[1]} features")
+        tables.append(compare_learners(X, y, names, args.n_jobs).assign(dataset=str(ds), n=len(X)))
+    table = pd.concat(tables, ignore_index=True)
+
+    with pd.option_context("display.width", 160, "display.max_columns", 20, "display.float_format", "{:.4f}".format):
+        print(table[["dataset", "learner", "n", "mae", "rmse", "r2", "wall_seconds"]].to_string(index=False))
+    if args.out_csv:
+        args.out_csv.parent.mkdir(parents=True, exist_ok=True)
+        table.to_csv(args.out_csv, index=False)
+        print(f"Saved {args.out_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,64 +2,356 @@
 """Utilities for loading perf datasets and building feature matrices."""
 from __future__ import annotations
 
+from collections import OrderedDict
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Dict, Tuple, Optional
 
 import numpy as np
 import pandas as pd
 
+MERGED_CSV = "merged.csv"
+# Written next to merged.csv by update_data.merge_csv when pyarrow is installed
+MERGED_COLUMNAR = "merged.feather"
+# Long (workload_name, tier, counter, value) table written by update_data.new_separate_csv
+LONG_CSV = "long.csv"
+LONG_COLUMNAR = "long.feather"
+BASELINE_TIER = "LOCAL"
+# Columns update_data.py parses from the .time/.mem/.output/.sysinfo run artifacts;
+# kept in the tables but never turned into features
+ARTIFACT_PREFIX = "run_"
+# update_data.trial_stats layout of run_trial_times: ';' between inputs, ',' between trials
+TRIAL_TIMES = "run_trial_times"
+TRIAL_GROUP_SEP = ";"
+TRIAL_SEP = ","
+# Leading trials slower than this times the median of a series' second half count as warm-up
+WARMUP_RATIO = 1.10
+TRIAL_CONFIDENCE = 0.95
 
-def load_dataset(csv_dir: Path, feature_mode: str = "all") -> Tuple[pd.DataFrame, pd.Series]:
+
+def _read_table(csv_dir: Path, csv_name: str, columnar_name: str) -> pd.DataFrame:
+    csv_dir = Path(csv_dir)
+    text = csv_dir / csv_name
+    columnar = csv_dir / columnar_name
+    if columnar.exists() and (not text.exists() or columnar.stat().st_mtime_ns >= text.stat().st_mtime_ns):
+        try:
+            from pyarrow import feather
+        except ImportError:
+            feather = None
+        if feather is not None:
+            df = feather.read_table(columnar, memory_map=True).to_pandas()
+            # Identifier columns are stored as categoricals; hand back plain strings so
+            # indexes/joins behave exactly like the CSV path.
+            for col in df.columns:
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    df[col] = df[col].astype(str)
+            return df
+    if not text.exists():
+        raise FileNotFoundError(f"{text} does not exist. Run update_data.py for {csv_dir}")
+    return pd.read_csv(text)
+
+
+def read_merged(csv_dir: Path) -> pd.DataFrame:
     """
-    Load LOCAL/NUMA counter CSVs from `csv_dir` (expects merged.csv as produced by update_data.py)
-    and return (features, slowdown) ready for modeling.
+    Read the merged per-tier counter table from `csv_dir`.
+
+    Prefers the memory-mapped Feather copy when it exists and is not older
+    than merged.csv; falls back to parsing merged.csv otherwise.
     """
-    merged = csv_dir / "merged.csv"
-    if not merged.exists():
-        raise FileNotFoundError(f"{merged} does not exist. Run update_data.py for {csv_dir}")
+    return _read_table(csv_dir, MERGED_CSV, MERGED_COLUMNAR)
 
-    df = pd.read_csv(merged)
-    local = df[df["mem_type"] == "LOCAL"].set_index("workload_name")
-    numa = df[df["mem_type"] == "NUMA"].set_index("workload_name")
 
-    joined = local.add_suffix("_local").join(numa.add_suffix("_numa"), how="inner").sort_index()
-    # Prefer CPU clock as the cycle baseline when available, fall back to generic cycles
-    if "CPU_CLK_UNHALTED.THREAD_local" in joined and "CPU_CLK_UNHALTED.THREAD_numa" in joined:
-        base_local = joined["CPU_CLK_UNHALTED.THREAD_local"]
-        base_numa = joined["CPU_CLK_UNHALTED.THREAD_numa"]
-        slowdown = (base_numa - base_local) / base_local
-        joined = joined.assign(_cycle_base_local=base_local)
-    else:
-        slowdown = (joined["cycles_numa"] - joined["cycles_local"]) / joined["cycles_local"]
-        joined = joined.assign(_cycle_base_local=joined["cycles_local"]) 
-    features = _build_features(joined, feature_mode)
-    return features, slowdown
+def merged_to_long(merged: pd.DataFrame) -> pd.DataFrame:
+    """Reshape a merged table into (workload_name, tier, counter, value) rows."""
+    counters = [
+        c for c in merged.columns
+        if c not in {"workload_id", "workload_name", "mem_type"} and not c.startswith("__")
+        and pd.api.types.is_numeric_dtype(merged[c])
+    ]
+    long = merged.melt(id_vars=["workload_name", "mem_type"], value_vars=counters, var_name="counter")
+    return long.rename(columns={"mem_type": "tier"}).dropna(subset=["value"])
 
 
-def compute_aol_feature(csv_dir: Path) -> Optional[pd.DataFrame]:
+def read_long(csv_dir: Path) -> pd.DataFrame:
+    """Long per-tier counter table of `csv_dir`; derived from merged.csv for folders built before it existed."""
+    try:
+        return _read_table(csv_dir, LONG_CSV, LONG_COLUMNAR)
+    except FileNotFoundError:
+        return merged_to_long(read_merged(csv_dir))
+
+
+def tier_slowdowns(long: pd.DataFrame, baseline: str = BASELINE_TIER) -> pd.DataFrame:
     """
-    Compute AOL = A1 / A3 from LOCAL (fast-tier) counters if available and return
-    a single-column DataFrame indexed by workload_name with column 'AOL'.
+    Slowdown of every tier against `baseline` for every workload at once.
 
-    A1: OFFCORE_REQUESTS_OUTSTANDING.CYCLES_WITH_DEMAND_DATA_RD
-    A3: OFFCORE_REQUESTS.DEMAND_DATA_RD
+    Uses CPU_CLK_UNHALTED.THREAD as the cycle count when it was collected and
+    generic cycles otherwise. Returns a workload_name x tier DataFrame.
     """
-    merged = csv_dir / "merged.csv"
-    if not merged.exists():
-        raise FileNotFoundError(f"{merged} does not exist. Run update_data.py for {csv_dir}")
+    counter = "CPU_CLK_UNHALTED.THREAD" if (long["counter"] == "CPU_CLK_UNHALTED.THREAD").any() else "cycles"
+    cyc = long[long["counter"] == counter].pivot_table(
+        index="workload_name", columns="tier", values="value", aggfunc="first"
+    )
+    if baseline not in cyc.columns:
+        raise ValueError(f"Baseline tier '{baseline}' not found; available tiers: {list(cyc.columns)}")
+    base = cyc[baseline]
+    others = cyc.drop(columns=baseline)
+    sd = others.sub(base, axis=0).div(base, axis=0)
+    sd.columns.name = "tier"
+    return sd.sort_index()
+
+
+# Small LRU of parsed datasets, keyed by folder + source file mtimes
+DATASET_CACHE_SIZE = 8
+_DATASET_CACHE: "OrderedDict[tuple, Dataset]" = OrderedDict()
 
-    df = pd.read_csv(merged)
-    local = df[df["mem_type"] == "LOCAL"].set_index("workload_name")
-    numa = df[df["mem_type"] == "NUMA"].set_index("workload_name")
-    joined = local.add_suffix("_local").join(numa.add_suffix("_numa"), how="inner").sort_index()
 
-    a1_col = "OFFCORE_REQUESTS_OUTSTANDING.CYCLES_WITH_DEMAND_DATA_RD_local"
-    a3_col = "OFFCORE_REQUESTS.DEMAND_DATA_RD_local"
-    if a1_col not in joined.columns or a3_col not in joined.columns:
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
         return None
-    eps = 1e-12
-    aol = joined[a1_col] / (joined[a3_col] + eps)
-    return pd.DataFrame({"AOL": aol}).astype(float)
+
+
+class Dataset:
+    """
+    Merged per-tier counters of one csv folder, read once.
+
+    The joined LOCAL/`tier` frame, slowdown vector, per-mode feature matrices and
+    AOL are computed lazily and memoized. The compared tier keeps the `_numa`
+    column suffix whatever its name, so feature names stay stable across sweeps.
+    Use `Dataset.load` to share instances across callers; it re-reads the folder
+    when merged.csv/merged.feather change. Returned frames are shared, so copy
+    before mutating them in place.
+    """
+
+    def __init__(self, csv_dir: Path, frame: pd.DataFrame, tier: str = "NUMA"):
+        self.csv_dir = Path(csv_dir)
+        self.frame = frame
+        self.tier = tier
+        self._joined: Optional[pd.DataFrame] = None
+        self._slowdown: Optional[pd.Series] = None
+        self._features: Dict[str, pd.DataFrame] = {}
+        self._aol: Optional[pd.DataFrame] = None
+        self._aol_done = False
+        self._tier_slowdowns: Optional[pd.DataFrame] = None
+        self._trial_stability: Optional[pd.DataFrame] = None
+        self._trial_stability_done = False
+
+    @classmethod
+    def load(cls, csv_dir: Path, tier: str = "NUMA") -> "Dataset":
+        csv_dir = Path(csv_dir).resolve()
+        key = (str(csv_dir), _mtime_ns(csv_dir / MERGED_CSV), _mtime_ns(csv_dir / MERGED_COLUMNAR), tier)
+        ds = _DATASET_CACHE.get(key)
+        if ds is not None:
+            _DATASET_CACHE.move_to_end(key)
+            return ds
+        # Other tiers of the same folder already hold the parsed frame
+        frame = next((d.frame for k, d in _DATASET_CACHE.items() if k[:3] == key[:3]), None)
+        ds = cls(csv_dir, read_merged(csv_dir) if frame is None else frame, tier)
+        _DATASET_CACHE[key] = ds
+        while len(_DATASET_CACHE) > DATASET_CACHE_SIZE:
+            _DATASET_CACHE.popitem(last=False)
+        return ds
+
+    @property
+    def joined(self) -> pd.DataFrame:
+        """LOCAL counters suffixed `_local` joined with `tier` counters suffixed `_numa`."""
+        if self._joined is None:
+            df = self.frame
+            if not (df["mem_type"] == self.tier).any():
+                raise ValueError(f"Tier '{self.tier}' not found in {self.csv_dir}")
+            local = df[df["mem_type"] == BASELINE_TIER].set_index("workload_name")
+            numa = df[df["mem_type"] == self.tier].set_index("workload_name")
+            joined = local.add_suffix("_local").join(numa.add_suffix("_numa"), how="inner").sort_index()
+            # Prefer CPU clock as the cycle baseline when available, fall back to generic cycles
+            if "CPU_CLK_UNHALTED.THREAD_local" in joined and "CPU_CLK_UNHALTED.THREAD_numa" in joined:
+                base_local = joined["CPU_CLK_UNHALTED.THREAD_local"]
+                base_numa = joined["CPU_CLK_UNHALTED.THREAD_numa"]
+            else:
+                base_local = joined["cycles_local"]
+                base_numa = joined["cycles_numa"]
+            self._slowdown = (base_numa - base_local) / base_local
+            self._joined = joined.assign(_cycle_base_local=base_local)
+        return self._joined
+
+    @property
+    def slowdown(self) -> pd.Series:
+        if self._slowdown is None:
+            self.joined
+        return self._slowdown
+
+    def features(self, feature_mode: str = "all") -> pd.DataFrame:
+        mode = feature_mode.lower()
+        if mode not in self._features:
+            self._features[mode] = _build_features(self.joined, mode)
+        return self._features[mode]
+
+    @property
+    def aol(self) -> Optional[pd.DataFrame]:
+        """
+        AOL = A1 / A3 from LOCAL (fast-tier) counters as a single-column DataFrame,
+        or None when the counters were not collected.
+
+        A1: OFFCORE_REQUESTS_OUTSTANDING.CYCLES_WITH_DEMAND_DATA_RD
+        A3: OFFCORE_REQUESTS.DEMAND_DATA_RD
+        """
+        if not self._aol_done:
+            joined = self.joined
+            a1_col = "OFFCORE_REQUESTS_OUTSTANDING.CYCLES_WITH_DEMAND_DATA_RD_local"
+            a3_col = "OFFCORE_REQUESTS.DEMAND_DATA_RD_local"
+            if a1_col in joined.columns and a3_col in joined.columns:
+                eps = 1e-12
+                aol = joined[a1_col] / (joined[a3_col] + eps)
+                self._aol = pd.DataFrame({"AOL": aol}).astype(float)
+            self._aol_done = True
+        return self._aol
+
+    @property
+    def tiers(self) -> list:
+        return list(pd.unique(self.frame["mem_type"]))
+
+    @property
+    def tier_slowdowns(self) -> pd.DataFrame:
+        """Slowdown of every tier in the folder against LOCAL (workload_name x tier)."""
+        if self._tier_slowdowns is None:
+            self._tier_slowdowns = tier_slowdowns(merged_to_long(self.frame))
+        return self._tier_slowdowns
+
+
+    @property
+    def trial_stability(self) -> Optional[pd.DataFrame]:
+        """
+        trial_stability of the LOCAL/`tier` trial times with the cycle-based
+        slowdown next to it, or None when no run has trial times.
+        """
+        if not self._trial_stability_done:
+            joined = self.joined
+            cols = [f"{TRIAL_TIMES}_local", f"{TRIAL_TIMES}_numa"]
+            if all(c in joined.columns for c in cols) and joined[cols].notna().any().all():
+                stab = trial_stability(joined[cols[0]], joined[cols[1]])
+                stab.insert(0, "cycles_slowdown", self.slowdown.reindex(stab.index))
+                self._trial_stability = stab
+            self._trial_stability_done = True
+        return self._trial_stability
+
+
+def trial_groups(times: pd.Series) -> pd.DataFrame:
+    """
+    Explode run_trial_times strings into one row per (workload, input group)
+    with the trials as NaN-padded float columns 0..max_trials-1.
+    """
+    groups = times.dropna().astype(str).str.split(TRIAL_GROUP_SEP).explode()
+    groups = groups[groups.str.len() > 0]
+    parts = groups.str.split(TRIAL_SEP)
+    lengths = parts.str.len().to_numpy(dtype=np.int64)
+    # One numeric conversion of all trials, scattered into the padded matrix
+    flat = pd.to_numeric(pd.Series(np.concatenate(parts.to_numpy()) if len(parts) else []), errors="coerce")
+    trials = np.full((len(parts), lengths.max(initial=0)), np.nan)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    trials[np.repeat(np.arange(len(parts)), lengths), np.arange(len(flat)) - starts] = flat.to_numpy(dtype=float)
+    index = pd.MultiIndex.from_arrays(
+        [groups.index, groups.groupby(level=0).cumcount().to_numpy()], names=[times.index.name or "workload_name", "group"]
+    )
+    return pd.DataFrame(trials, index=index)
+
+
+def steady_trials(trials: pd.DataFrame, ratio: float = WARMUP_RATIO) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (steady-state mask, warm-up count) of every trial_groups row. Warm-up is the
+    run of leading trials above `ratio` x the median of the row's second half;
+    rows with fewer than 3 trials have none, and at least 2 trials always stay.
+    """
+    t = trials.to_numpy()
+    present = ~np.isnan(t)
+    n = present.sum(axis=1)
+    pos = np.arange(t.shape[1])
+    ref = np.nanmedian(np.where(pos >= (n // 2)[:, None], t, np.nan), axis=1) if t.size else np.zeros(len(t))
+    slow = np.nan_to_num(t > ratio * ref[:, None], nan=0).astype(bool) & present
+    warmup = np.cumprod(slow, axis=1).sum(axis=1)
+    warmup = np.where(n >= 3, np.minimum(warmup, n - 2), 0)
+    return present & (pos >= warmup[:, None]), warmup
+
+
+def _row_moments(trials: pd.DataFrame, mask: np.ndarray) -> pd.DataFrame:
+    t = np.where(mask, trials.to_numpy(), np.nan)
+    n = mask.sum(axis=1)
+    mean = np.where(n >= 1, np.nansum(t, axis=1) / np.maximum(n, 1), np.nan)
+    var = np.nansum((t - mean[:, None]) ** 2, axis=1) / np.maximum(n - 1, 1)
+    var = np.where(n >= 2, var, np.nan)
+    return pd.DataFrame({"n": n, "mean": mean, "var": var}, index=trials.index)
+
+
+def trial_stability(local_times: pd.Series, numa_times: pd.Series, ratio: float = WARMUP_RATIO,
+                    confidence: float = TRIAL_CONFIDENCE) -> pd.DataFrame:
+    """
+    Trial-level slowdown of every workload from its run_trial_times on both tiers.
+
+    Per input group, warm-up trials are dropped (steady_trials) and the slowdown
+    is the ratio of steady-state mean times minus 1, with its variance from the
+    delta method. Groups are averaged with equal weight (PBBS inputs) and the
+    `confidence` interval uses Student's t on the smallest steady trial count.
+    Columns: trials/warmup/cv per tier, trial_slowdown, trial_sd_lo/hi and
+    trial_ci (half-width; NaN when a tier has single trials).
+    """
+    from scipy import stats
+
+    per_tier = {}
+    for tier, times in (("local", local_times), ("numa", numa_times)):
+        trials = trial_groups(times)
+        mask, warmup = steady_trials(trials, ratio)
+        m = _row_moments(trials, mask)
+        m["warmup"] = warmup
+        per_tier[tier] = m
+    g = per_tier["local"].join(per_tier["numa"], how="inner", lsuffix="_local", rsuffix="_numa")
+    ratio_g = g["mean_numa"] / g["mean_local"]
+    rel_var = g["var_numa"] / (g["n_numa"] * g["mean_numa"] ** 2) + g["var_local"] / (g["n_local"] * g["mean_local"] ** 2)
+    g = g.assign(
+        sd=ratio_g - 1.0,
+        sd_var=ratio_g ** 2 * rel_var,
+        cv_local=np.sqrt(g["var_local"]) / g["mean_local"],
+        cv_numa=np.sqrt(g["var_numa"]) / g["mean_numa"],
+        df=np.minimum(g["n_local"], g["n_numa"]) - 1,
+    )
+    by = g.groupby(level=0, sort=True)
+    k = by.size()
+    out = pd.DataFrame({
+        "trials_local": by["n_local"].sum(),
+        "trials_numa": by["n_numa"].sum(),
+        "warmup_local": by["warmup_local"].sum(),
+        "warmup_numa": by["warmup_numa"].sum(),
+        "cv_local": by["cv_local"].mean(),
+        "cv_numa": by["cv_numa"].mean(),
+        "trial_slowdown": by["sd"].mean(),
+    })
+    se = np.sqrt(by["sd_var"].sum(min_count=1)) / k
+    df = by["df"].min()
+    half = pd.Series(stats.t.ppf(0.5 + confidence / 2, df.where(df >= 1)), index=df.index) * se
+    out["trial_sd_lo"] = out["trial_slowdown"] - half
+    out["trial_sd_hi"] = out["trial_slowdown"] + half
+    out["trial_ci"] = half
+    out.index.name = "workload_name"
+    return out
+
+
+def clear_dataset_cache() -> None:
+    _DATASET_CACHE.clear()
+
+
+def load_dataset(csv_dir: Path, feature_mode: str = "all", tier: str = "NUMA") -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Load LOCAL/`tier` counters from `csv_dir` (expects merged.csv/merged.feather as produced by
+    update_data.py) and return (features, slowdown) ready for modeling.
+    """
+    ds = Dataset.load(csv_dir, tier)
+    return ds.features(feature_mode).copy(), ds.slowdown.copy()
+
+
+def compute_aol_feature(csv_dir: Path) -> Optional[pd.DataFrame]:
+    """
+    Compute AOL = A1 / A3 from LOCAL (fast-tier) counters if available and return
+    a single-column DataFrame indexed by workload_name with column 'AOL'.
+    """
+    aol = Dataset.load(csv_dir).aol
+    return None if aol is None else aol.copy()
 
 
 def _build_features(joined: pd.DataFrame, feature_mode: str) -> pd.DataFrame:
@@ -122,7 +414,7 @@ def _build_features_all(joined: pd.DataFrame) -> pd.DataFrame:
     for col in joined.columns:
         if not col.endswith("_local"):
             continue
-        if col in {"instructions_local", "cycles_local", "time_local"}:
+        if col in {"instructions_local", "cycles_local", "time_local"} or col.startswith(ARTIFACT_PREFIX):
             continue
         if not pd.api.types.is_numeric_dtype(joined[col]):
             continue
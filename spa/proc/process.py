@@ -1,14 +1,17 @@
-import sys
-import csv
+import argparse
+from collections import OrderedDict
+from pathlib import Path
 import matplotlib.pyplot as plt
-import numpy as np
 import os
 import pandas as pd
 
-events = ["time", "instructions", "cycles", "CYCLE_ACTIVITY.STALLS_MEM_ANY", \
-  "EXE_ACTIVITY.BOUND_ON_STORES", "CYCLE_ACTIVITY.STALLS_L3_MISS", \
-  "CYCLE_ACTIVITY.STALLS_L2_MISS", "CYCLE_ACTIVITY.STALLS_L1D_MISS", \
-  "EXE_ACTIVITY.1_PORTS_UTIL", "EXE_ACTIVITY.2_PORTS_UTIL", "PARTIAL_RAT_STALLS.SCOREBOARD"]
+try:
+  import spa.proc.update_data as u
+except ImportError:  # allow running as plain script
+  import sys
+
+  sys.path.append(str(Path(__file__).resolve().parents[2]))
+  import spa.proc.update_data as u
 
 sd_m = ["cycles"]
 load_sd_m = ["CYCLE_ACTIVITY.STALLS_MEM_ANY", "cycles"]
@@ -20,61 +23,15 @@ l2_sd_m = ["CYCLE_ACTIVITY.STALLS_L1D_MISS", "CYCLE_ACTIVITY.STALLS_L2_MISS", "c
 l3_sd_m = ["CYCLE_ACTIVITY.STALLS_L2_MISS", "CYCLE_ACTIVITY.STALLS_L3_MISS", "cycles"]
 core_sd_m = ["EXE_ACTIVITY.1_PORTS_UTIL", "EXE_ACTIVITY.2_PORTS_UTIL", "PARTIAL_RAT_STALLS.SCOREBOARD", "cycles"]
 
+# Breakdown components in plotting order; "other" is the remainder of "sd"
+components = OrderedDict([("store", store_sd_m), ("dram", dram_sd_m), ("l3", l3_sd_m), \
+  ("l2", l2_sd_m), ("l1", l1_sd_m), ("core", core_sd_m)])
+
 def check_file_exist(file):
   if not os.path.isfile(file):
     print(file + "is not existed")
     exit(0)
 
-def get_vals(event_name, mem_type, csv_path):
-  filename = os.path.join(csv_path, 'm'+str(mem_type)+'.csv')
-  check_file_exist(filename)
-  df = pd.read_csv(filename, index_col ="workload_id")
-  columns = df.columns.values.tolist()
-  assert event_name in events
-  assert event_name in columns
-  res = []
-  for val in df[event_name]:
-    res.append(val)
-  return np.asarray(res)
-
-def get_workloads(df):
-  columns = df.columns.values.tolist()
-  assert "workload_name" in columns
-  workloads = []
-  for name in df["workload_name"]:
-    if name not in workloads:
-      workloads.append(name)
-  return workloads
-
-def get_slowdowns(t1, t2, metric, csv_path):
-  if len(metric) == 1:
-    v1, v2 = get_vals(metric[0], t1, csv_path), get_vals(metric[0], t2, csv_path)
-    return (v2-v1)/v1
-  elif len(metric) == 2:
-    v1, v2 = get_vals(metric[0], t1, csv_path), get_vals(metric[0], t2, csv_path)
-    cyc1 = get_vals(metric[1], t1, csv_path)
-    return (v2 - v1)/cyc1
-  elif len(metric) == 3:
-    a1, a2 = get_vals(metric[0], t1, csv_path), get_vals(metric[0], t2, csv_path)
-    b1, b2 = get_vals(metric[1], t1, csv_path), get_vals(metric[1], t2, csv_path)
-    cyc1 = get_vals(metric[2], t1, csv_path)
-    return ((a2-b2)-(a1-b1))/cyc1
-  elif len(metric) == 4:
-    a1, a2 = get_vals(metric[0], t1, csv_path), get_vals(metric[0], t2, csv_path)
-    b1, b2 = get_vals(metric[1], t1, csv_path), get_vals(metric[1], t2, csv_path)
-    c1, c2 = get_vals(metric[2], t1, csv_path), get_vals(metric[2], t2, csv_path)
-    cyc1 = get_vals(metric[3], t1, csv_path)
-    return ((a2-a1)+(b2-b1)+(c2-c1))/cyc1
-  print("error")
-  exit(0)
-
-def cal_vals(metric, latency, csv_path):
-  vals = []
-  events = metric['events']
-  for e in events:
-    vals.append(get_vals(e, latency, csv_path))
-  return metric['function'](vals)
-
 def draw_bars_b(data, x, output_path, filename, loc, xlabel, ylabel, title):
   xs = range(len(x))
   [store_sd, dram_sd, l3_sd, l2_sd, l1_sd, core_sd, other] = data
@@ -103,32 +60,95 @@ def draw_bars_b(data, x, output_path, filename, loc, xlabel, ylabel, title):
   plt.savefig(output_path+'/'+filename+'.pdf', format='pdf')
   plt.clf()
 
+def load_tiers(csv_path, mem_types=("LOCAL", "NUMA")):
+  """
+  Read every m<TYPE>.csv under csv_path exactly once and return
+  {mem_type: frame indexed by workload_name}.
+  """
+  frames = OrderedDict()
+  for t in mem_types:
+    filename = os.path.join(csv_path, 'm'+str(t)+'.csv')
+    check_file_exist(filename)
+    frames[t] = pd.read_csv(filename).set_index("workload_name")
+  return frames
+
+def slowdown_component(base, tier, metric):
+  """Whole-array get_slowdowns on two aligned tier frames."""
+  cyc = base[metric[-1]]
+  if len(metric) == 1:
+    return (tier[metric[0]] - base[metric[0]])/base[metric[0]]
+  elif len(metric) == 2:
+    return (tier[metric[0]] - base[metric[0]])/cyc
+  elif len(metric) == 3:
+    a, b = metric[0], metric[1]
+    return ((tier[a]-tier[b])-(base[a]-base[b]))/cyc
+  elif len(metric) == 4:
+    a, b, c = metric[0], metric[1], metric[2]
+    return ((tier[a]-base[a])+(tier[b]-base[b])+(tier[c]-base[c]))/cyc
+  raise ValueError(f"unsupported metric {metric}")
+
+def breakdown(base, tier):
+  """
+  Stall-based slowdown breakdown of `tier` relative to `base` for every
+  workload present in both. Returns a DataFrame indexed by workload_name
+  (in `base` order) with columns sd, store, dram, l3, l2, l1, core, other.
+  """
+  common = base.index.intersection(tier.index, sort=False)
+  base, tier = base.loc[common], tier.loc[common]
+  res = pd.DataFrame(index=base.index)
+  res["sd"] = slowdown_component(base, tier, sd_m)
+  other = res["sd"].copy()
+  for name, metric in components.items():
+    res[name] = slowdown_component(base, tier, metric)
+  for name in ("dram", "l3", "l2", "l1", "store", "core"):
+    other = other - res[name]
+  res["other"] = other
+  return res
+
+def breakdown_datasets(csv_paths, base_type="LOCAL", tier_types=("NUMA",)):
+  """
+  Breakdown for several csv folders and tiers in one call (tier_types=None
+  means every tier found in each folder). Returns a long DataFrame indexed
+  by (dataset, tier, workload_name).
+  """
+  parts = OrderedDict()
+  for csv_path in csv_paths:
+    name = os.path.basename(os.path.normpath(csv_path))
+    if name == "csv":
+      name = os.path.basename(os.path.dirname(os.path.abspath(csv_path)))
+    types = tier_types
+    if types is None:
+      types = [t for t in u.tier_csvs(csv_path) if t != base_type]
+    tiers = load_tiers(csv_path, (base_type, *types))
+    for t in types:
+      parts[(name, t)] = breakdown(tiers[base_type], tiers[t])
+  return pd.concat(parts, names=["dataset", "tier", "workload_name"])
+
 def main():
-  csv_path = "csv"
-  isExist = os.path.exists(csv_path)
-  if not isExist:
-    print("error: csv does not exist")
-    exit()
-  filename = os.path.join(csv_path, 'merged.csv')
-  df = pd.read_csv(filename, index_col ="workload_id")
-  workloads = get_workloads(df)
-  # workloads.sort()
-  # print(workloads)
-  sd = get_slowdowns("LOCAL", "NUMA", sd_m, csv_path)
-  dram_sd = get_slowdowns("LOCAL", "NUMA", dram_sd_m, csv_path)
-  l3_sd = get_slowdowns("LOCAL", "NUMA", l3_sd_m, csv_path)
-  l2_sd = get_slowdowns("LOCAL", "NUMA", l2_sd_m, csv_path)
-  l1_sd = get_slowdowns("LOCAL", "NUMA", l1_sd_m, csv_path)
-  store_sd = get_slowdowns("LOCAL", "NUMA", store_sd_m, csv_path)
-  core_sd = get_slowdowns("LOCAL", "NUMA", core_sd_m, csv_path)
-  other = sd - dram_sd - l3_sd - l2_sd - l1_sd - store_sd - core_sd
+  parser = argparse.ArgumentParser(description='Plot the stall-based slowdown breakdown')
+  parser.add_argument('csv_paths', nargs='*', default=["csv"], help='csv folders written by update_data.py')
+  parser.add_argument('--out', default="plots", help='output folder for the plot and breakdown table')
+  parser.add_argument('--tiers', default="NUMA", \
+    help='comma-separated tiers to compare against LOCAL, or "all" for every m<TIER>.csv found')
+  args = parser.parse_args()
+  tier_types = None if args.tiers == "all" else tuple(t for t in args.tiers.split(",") if t)
+  for csv_path in args.csv_paths:
+    if not os.path.exists(csv_path):
+      print("error: " + csv_path + " does not exist")
+      exit()
 
-  output_path = "plots"
+  output_path = args.out
   isExist = os.path.exists(output_path)
   if not isExist:
     os.makedirs(output_path)
-  draw_bars_b([store_sd, dram_sd, l3_sd, l2_sd, l1_sd, core_sd, other], \
-    workloads, output_path, "sd_breakdown", [0.17, 1.01], \
+  table = breakdown_datasets(args.csv_paths, tier_types=tier_types)
+  table.to_csv(os.path.join(output_path, "sd_breakdown.csv"))
+  if len(args.csv_paths) != 1 or table.index.get_level_values("tier").nunique() != 1:
+    return
+
+  bd = table.droplevel(["dataset", "tier"])
+  data = [bd[c].to_numpy() for c in ("store", "dram", "l3", "l2", "l1", "core", "other")]
+  draw_bars_b(data, list(bd.index), output_path, "sd_breakdown", [0.17, 1.01], \
     "Workloads", "Slowdown", "Slowdown Breakdown")
 
 if __name__ == "__main__":
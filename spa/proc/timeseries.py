@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Helpers for `perf stat -I -x,` time series (see spa/gapbs/*/run_timeseries.sh).
+
+Pipeline: load -> cumulative counters -> resample onto equal-instruction
+checkpoints -> per-bin deltas, so a LOCAL and a remote run of the same
+workload can be compared bin by bin.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    from spa.proc.tree_export import CompiledTrees
+except ImportError:  # allow running as plain script
+    import sys
+
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from spa.proc.tree_export import CompiledTrees
+
+# Lines parsed per chunk; bounds peak memory of the loader
+PERF_CHUNK_LINES = 1_000_000
+N_BINS = 1000
+# Local runs whose instruction total is this many times smaller are rescaled
+UNDERCOUNT_RATIO = 2.0
+
+# Idle latencies of the two tiers (ns) for the heuristic lower bound
+L_LOC = 94.8
+L_REM = 192.0
+# Hyperbolic AOL fit K = 1 / (a + b / AOL), from notebooks/hyperbolic_fit_from_rst.ipynb
+AOL_A = 0.317760
+AOL_B = 7.329282
+# Features the time-series ML model was trained on
+ML_FEATURES = [
+    "CYCLE_ACTIVITY.STALLS_L3_MISS_per_cycle",
+    "EXE_ACTIVITY.2_PORTS_UTIL_per_instr",
+    "OFFCORE_REQUESTS.DEMAND_DATA_RD_per_cycle",
+]
+PREDICTORS = ["P", "AOL_Pred", "ML_Pred", "Heuristic_Pred"]
+_MEM_ANY = "CYCLE_ACTIVITY.STALLS_MEM_ANY"
+# Other model_utils features that are ratios of counters: (numerator counters, denominator)
+RATIO_FEATURES = {
+    "ipc": (("instructions",), "cycles"),
+    "store_share": (("EXE_ACTIVITY.BOUND_ON_STORES",), _MEM_ANY),
+    "core_share": (("EXE_ACTIVITY.1_PORTS_UTIL", "EXE_ACTIVITY.2_PORTS_UTIL", "PARTIAL_RAT_STALLS.SCOREBOARD"), _MEM_ANY),
+    "CYCLE_ACTIVITY.STALLS_L1D_MISS_share": (("CYCLE_ACTIVITY.STALLS_L1D_MISS",), _MEM_ANY),
+    "CYCLE_ACTIVITY.STALLS_L2_MISS_share": (("CYCLE_ACTIVITY.STALLS_L2_MISS",), _MEM_ANY),
+    "CYCLE_ACTIVITY.STALLS_L3_MISS_share": (("CYCLE_ACTIVITY.STALLS_L3_MISS",), _MEM_ANY),
+    "AOL": (("OFFCORE_REQUESTS_OUTSTANDING.CYCLES_WITH_DEMAND_DATA_RD",), "OFFCORE_REQUESTS.DEMAND_DATA_RD"),
+}
+
+
+def load_perf_csv(filepath: Path, chunksize: int = PERF_CHUNK_LINES) -> pd.DataFrame:
+    """
+    Load a `perf stat -I -x,` file into one row per timestamp and one column per event.
+
+    Rows are `timestamp,value,unit,event,run,pct[,metric,unit]`. The file is parsed
+    with the C engine in chunks, keeping only timestamp/value/event, and each chunk
+    is unstacked right away so memory is bounded by the chunk size.
+    """
+    reader = pd.read_csv(
+        filepath, engine="c", header=None, comment="#", usecols=[0, 1, 3],
+        names=["timestamp", "value", "unit", "event"], index_col=False,
+        dtype={"timestamp": "float64", "value": "float64", "event": "category"},
+        na_values=["<not counted>", "<not supported>"], skip_blank_lines=True,
+        on_bad_lines="skip", chunksize=chunksize,
+    )
+    parts = []
+    for chunk in reader:
+        chunk = chunk.dropna()
+        wide = chunk.set_index(["timestamp", "event"], drop=True)["value"]
+        wide = wide[~wide.index.duplicated(keep="first")].unstack("event")
+        wide.columns = wide.columns.astype(str)
+        parts.append(wide)
+
+    # A timestamp split across two chunks shows up twice; merge its halves
+    df = pd.concat(parts)
+    if df.index.has_duplicates:
+        df = df.groupby(level=0).first()
+    df = df.sort_index().sort_index(axis=1)
+    df.columns.name = "event"
+    return df
+
+
+def rescale_undercounted(local_df: pd.DataFrame, remote_df: pd.DataFrame,
+                         max_ratio: float = UNDERCOUNT_RATIO, verbose: bool = True) -> Tuple[pd.DataFrame, float]:
+    """
+    Scale the local run up when its instruction total is far below the remote one
+    (perf -I missing threads in the local run). Returns (local_df, ratio applied).
+    perf -I reports deltas, so summing a column gives the run total.
+    """
+    total_local = local_df["instructions"].sum()
+    total_remote = remote_df["instructions"].sum()
+    if verbose:
+        print(f"Total Local Instr: {total_local:.0f}")
+        print(f"Total Remote Instr: {total_remote:.0f}")
+    if total_local > 0 and total_remote > 0:
+        ratio = total_remote / total_local
+        if ratio > max_ratio:
+            if verbose:
+                print(f"WARNING: Huge instruction discrepancy detected (Ratio: {ratio:.2f}).")
+                print("Assuming Local run under-counted (e.g. perf missing threads). Scaling Local data...")
+            return local_df * ratio, ratio
+    return local_df, 1.0
+
+
+def process_cumulative(df: pd.DataFrame) -> pd.DataFrame:
+    """Cumulative counters per sample plus `timestamp` and `cumulative_instructions` columns."""
+    df = df.fillna(0)
+    cum_df = df.cumsum()
+    # The index is already cumulative time since start
+    cum_df["timestamp"] = df.index
+    cum_df["cumulative_instructions"] = cum_df["instructions"]
+    return cum_df
+
+
+def instruction_checkpoints(local_cum: pd.DataFrame, remote_cum: pd.DataFrame, n_bins: int = N_BINS) -> np.ndarray:
+    """`n_bins + 1` equidistant instruction counts covering the range both runs reached."""
+    max_instr = min(local_cum["cumulative_instructions"].iloc[-1], remote_cum["cumulative_instructions"].iloc[-1])
+    return np.linspace(0, max_instr, n_bins + 1)
+
+
+def interp_columns(src_x: np.ndarray, src_y: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Piecewise-linear interpolation of every column of `src_y` (n x k) at `x`, sharing
+    the segment search across columns; extrapolates linearly like
+    `interp1d(..., fill_value="extrapolate")`. `src_x` must be non-decreasing.
+    """
+    hi = np.clip(np.searchsorted(src_x, x, side="left"), 1, len(src_x) - 1)
+    lo = hi - 1
+    dx = src_x[hi] - src_x[lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(dx > 0, (x - src_x[lo]) / dx, 0.0)
+    return src_y[lo] + w[:, None] * (src_y[hi] - src_y[lo])
+
+
+def resample_dataset(cum_df: pd.DataFrame, target_instr_points: np.ndarray) -> pd.DataFrame:
+    """
+    Interpolate all cumulative columns at the instruction checkpoints and return
+    per-bin deltas (one row per bin) with an `interval_seconds` column.
+    """
+    src_x = np.concatenate(([0.0], cum_df["cumulative_instructions"].to_numpy(dtype=float)))
+    src_y = np.vstack([np.zeros((1, cum_df.shape[1])), cum_df.to_numpy(dtype=float)])
+    resampled = interp_columns(src_x, src_y, np.asarray(target_instr_points, dtype=float))
+    interval_df = pd.DataFrame(np.diff(resampled, axis=0), columns=cum_df.columns)
+    # timestamp in cum_df is cumulative time, so its delta is the bin duration
+    interval_df["interval_seconds"] = interval_df["timestamp"]
+    return interval_df
+
+
+def bin_runs(local_df: pd.DataFrame, remote_df: pd.DataFrame, n_bins: int = N_BINS
+             ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """
+    Drop incomplete samples, accumulate and resample both runs onto shared
+    instruction bins. Returns (local_cum, remote_cum, local_binned, remote_binned).
+    """
+    local_cum = process_cumulative(local_df.dropna())
+    remote_cum = process_cumulative(remote_df.dropna())
+    checkpoints = instruction_checkpoints(local_cum, remote_cum, n_bins)
+    return local_cum, remote_cum, resample_dataset(local_cum, checkpoints), resample_dataset(remote_cum, checkpoints)
+
+
+def func_k(aol, a: float, b: float):
+    return 1.0 / (a + b / aol)
+
+
+def analysis_frame(local_binned: pd.DataFrame, remote_binned: pd.DataFrame) -> pd.DataFrame:
+    """
+    Remote bins with the actual slowdown, the local bin time, P = L3-miss stalls per
+    cycle, AOL = A1 / A3 and an absolute time axis. Bins with no local time are dropped.
+    """
+    # Bins hold equal work (instructions), so slowdown is the ratio of bin times
+    mask = local_binned["interval_seconds"] > 1e-9
+    local_t = local_binned.loc[mask, "interval_seconds"]
+    df = remote_binned[mask].copy()
+    df["Actual_Slowdown"] = (df["interval_seconds"] - local_t) / local_t
+    df["Local_Interval_Time"] = local_t
+    df["P"] = df["CYCLE_ACTIVITY.STALLS_L3_MISS"] / df["cycles"]
+    df["AOL"] = df["OFFCORE_REQUESTS_OUTSTANDING.CYCLES_WITH_DEMAND_DATA_RD"] / \
+        df["OFFCORE_REQUESTS.DEMAND_DATA_RD"].replace(0, np.nan)
+    df["timestamp"] = df["interval_seconds"].cumsum()
+    return df
+
+
+def fit_aol_params(df: pd.DataFrame, p0: Tuple[float, float] = (1.0, 10.0)) -> Tuple[float, float]:
+    """Fit a, b of func_k to K = slowdown / P on the bins of an analysis frame."""
+    from scipy.optimize import curve_fit
+
+    fit = df.dropna(subset=["P", "AOL", "Actual_Slowdown"])
+    fit = fit[(fit["AOL"] > 0) & (fit["Actual_Slowdown"] > -0.5)]
+    k_target = fit["Actual_Slowdown"] / fit["P"]
+    popt, _ = curve_fit(func_k, fit["AOL"], k_target, p0=list(p0), bounds=(0, [np.inf, np.inf]))
+    return float(popt[0]), float(popt[1])
+
+
+def heuristic_params(local_cum: pd.DataFrame, l_loc: float = L_LOC) -> Tuple[float, float, float]:
+    """
+    (alpha_naive, MLP_avg, alpha_min) of the heuristic lower bound from the totals
+    of the local run: alpha_min = (L3-miss stalls / cycles) / average MLP.
+    """
+    total_stalls = local_cum["CYCLE_ACTIVITY.STALLS_L3_MISS"].iloc[-1]
+    total_cycles = local_cum["cycles"].iloc[-1]
+    total_misses = local_cum["OFFCORE_REQUESTS.DEMAND_DATA_RD"].iloc[-1]
+    total_time_s = local_cum["timestamp"].iloc[-1]
+    return alpha_min_from_totals(total_stalls, total_cycles, total_misses, total_time_s, l_loc)
+
+
+def alpha_min_from_totals(stalls: float, cycles: float, misses: float, seconds: float,
+                          l_loc: float = L_LOC) -> Tuple[float, float, float]:
+    alpha_naive = stalls / cycles
+    freq = cycles / seconds
+    stall_time_ns = (stalls / freq) * 1e9
+    mlp_avg = max((misses * l_loc) / stall_time_ns, 1.0)
+    return alpha_naive, mlp_avg, min(alpha_naive / mlp_avg, 1.0)
+
+
+def heuristic_lower_bound(misses, t_loc, alpha_min: float, delta_l: float = L_REM - L_LOC) -> np.ndarray:
+    """Extra stall time of every miss at alpha_min, relative to the local bin time (0 for empty bins)."""
+    misses = np.asarray(misses, dtype=float)
+    t_loc = np.asarray(t_loc, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        term = (misses * alpha_min * delta_l) / (t_loc * 1e9)
+    return np.where(t_loc <= 1e-5, 0.0, term)
+
+
+def feature_inputs(name: str) -> Optional[Tuple[Tuple[str, ...], str]]:
+    """
+    (numerator counters, denominator counter) of a model feature, or None when it
+    has no per-interval form: whole-run features such as time_local, log_time
+    and log_cycles only exist for complete runs.
+    """
+    if name in RATIO_FEATURES:
+        return RATIO_FEATURES[name]
+    for suffix, denominator in (("_per_cycle", "cycles"), ("_per_instr", "instructions")):
+        if name.endswith(suffix):
+            counter = name[: -len(suffix)]
+            # model_utils' cycle base is the cycle count itself
+            return ("cycles" if counter == "_cycle_base" else counter,), denominator
+    return None
+
+
+def unsupported_features(columns: Sequence[str], counters: Optional[Sequence[str]] = None) -> List[str]:
+    """Features of `columns` that cannot be built per interval, or (given `counters`) not from those counters."""
+    out = []
+    for name in columns:
+        spec = feature_inputs(name)
+        if spec is None or (counters is not None and not set(spec[0] + (spec[1],)) <= set(counters)):
+            out.append(name)
+    return out
+
+
+def ml_feature_frame(df: pd.DataFrame, columns: Sequence[str] = ML_FEATURES) -> pd.DataFrame:
+    """Build the model features from binned counters (see feature_inputs); raises on unsupported ones."""
+    missing = unsupported_features(columns, list(df.columns))
+    if missing:
+        raise KeyError(f"Features not computable from the perf counters: {missing}")
+    feats = {}
+    for name in columns:
+        numerators, denominator = feature_inputs(name)
+        feats[name] = sum(df[c] for c in numerators) / df[denominator]
+    return pd.DataFrame(feats, index=df.index).replace([np.inf, -np.inf], np.nan).fillna(0)
+
+
+def load_model(path: Path):
+    """
+    Load a model bundle; returns (model, feature_columns or None). The NumPy
+    export (model.npz, see tree_export.py) is used instead of model.joblib when
+    it is at least as new, which avoids importing scikit-learn.
+    """
+    path = Path(path)
+    compiled = path.with_suffix(".npz")
+    if compiled.exists() and (not path.exists() or compiled.stat().st_mtime_ns >= path.stat().st_mtime_ns):
+        model = CompiledTrees.load(compiled)
+        return model, model.feature_columns
+
+    import joblib
+
+    loaded = joblib.load(path)
+    if isinstance(loaded, dict):
+        return loaded["model"], loaded.get("feature_columns")
+    return loaded, None
+
+
+def predict_all(df: pd.DataFrame, local_cum: pd.DataFrame, a: float = AOL_A, b: float = AOL_B,
+                l_loc: float = L_LOC, l_rem: float = L_REM, model=None,
+                feature_columns: Optional[Sequence[str]] = None) -> Dict[str, float]:
+    """
+    Add K_pred/AOL_Pred, ML_Pred and Heuristic_Pred to an analysis frame in place
+    (P is already there). Returns the heuristic parameters. ML_Pred is NaN, with
+    a warning, when the model needs features the binned counters cannot give.
+    """
+    df["K_pred"] = func_k(df["AOL"], a, b)
+    df["AOL_Pred"] = df["P"] * df["K_pred"]
+    df["ML_Pred"] = np.nan
+    if model is not None:
+        columns = list(feature_columns or ML_FEATURES)
+        missing = unsupported_features(columns, list(df.columns))
+        if missing:
+            print(f"[WARN] ML_Pred left NaN: model features not computable from the perf counters: {missing}")
+        else:
+            df["ML_Pred"] = model.predict(ml_feature_frame(df, columns))
+    alpha_naive, mlp_avg, alpha_min = heuristic_params(local_cum, l_loc)
+    df["Heuristic_Pred"] = heuristic_lower_bound(
+        df["OFFCORE_REQUESTS.DEMAND_DATA_RD"], df["Local_Interval_Time"], alpha_min, l_rem - l_loc
+    )
+    return {"alpha_naive": alpha_naive, "mlp_avg": mlp_avg, "alpha_min": alpha_min}
+
+
+def analyze_workload(workload_dir: Path, n_bins: int = N_BINS, model_path: Optional[Path] = None,
+                     a: float = AOL_A, b: float = AOL_B, l_loc: float = L_LOC, l_rem: float = L_REM,
+                     local_name: str = "results_ts/local.csv", remote_name: str = "results_ts/remote.csv",
+                     ) -> pd.DataFrame:
+    """Full pipeline for one workload folder; returns its analysis frame with all predictors."""
+    workload_dir = Path(workload_dir)
+    local_df = load_perf_csv(workload_dir / local_name)
+    remote_df = load_perf_csv(workload_dir / remote_name)
+    local_df, _ = rescale_undercounted(local_df, remote_df, verbose=False)
+    local_cum, _, local_binned, remote_binned = bin_runs(local_df, remote_df, n_bins)
+    df = analysis_frame(local_binned, remote_binned)
+    model, feature_columns = (None, None)
+    if model_path is not None and (Path(model_path).exists() or Path(model_path).with_suffix(".npz").exists()):
+        model, feature_columns = load_model(model_path)
+    predict_all(df, local_cum, a, b, l_loc, l_rem, model, feature_columns)
+    return df
+
+
+def summarize_predictions(table: pd.DataFrame, predictors: List[str] = PREDICTORS) -> pd.DataFrame:
+    """Per-workload mean slowdown and MAE/R2 of every predictor over the bins."""
+    def _one(g: pd.DataFrame) -> pd.Series:
+        y = g["Actual_Slowdown"].to_numpy()
+        row = {"bins": len(g), "actual_mean": float(np.nanmean(y))}
+        ss_tot = float(np.nansum((y - np.nanmean(y)) ** 2))
+        for p in predictors:
+            pred = g[p].to_numpy(dtype=float)
+            ok = np.isfinite(pred) & np.isfinite(y)
+            row[f"{p}_mean"] = float(np.mean(pred[ok])) if ok.any() else np.nan
+            row[f"{p}_mae"] = float(np.mean(np.abs(pred[ok] - y[ok]))) if ok.any() else np.nan
+            ss_res = float(np.sum((pred[ok] - y[ok]) ** 2))
+            row[f"{p}_r2"] = 1.0 - ss_res / ss_tot if ok.any() and ss_tot > 0 else np.nan
+        return pd.Series(row)
+
+    summary = pd.DataFrame({w: _one(g) for w, g in table.groupby("workload", sort=False)}).T
+    summary["bins"] = summary["bins"].astype(int)
+    return summary.rename_axis("workload")
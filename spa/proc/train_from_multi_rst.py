@@ -3,7 +3,7 @@
 Train from multiple rst folders (hardcoded list) into a single model.
 
 Flow per rst:
-  - Generate CSVs under out/<rst_name>/csv using update_data helpers
+  - Generate CSVs under out/<rst_name>/csv using update_data helpers (incremental)
 Then:
   - Concatenate all merged.csv with workload_name prefixed by dataset name
   - Build features (full set internally), optionally append AOL
@@ -16,6 +16,7 @@ from __future__ import annotations
 
 import argparse
 import json
+import time
 from pathlib import Path
 from typing import Dict, List
 
@@ -23,19 +24,25 @@ import joblib
 import numpy as np
 import pandas as pd
 from sklearn.base import clone
-from sklearn.ensemble import GradientBoostingRegressor
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from sklearn.model_selection import LeaveOneOut
+from sklearn.model_selection import GroupKFold, LeaveOneGroupOut, LeaveOneOut
 
 try:
     import spa.proc.update_data as u
-    from spa.proc.model_utils import load_dataset, compute_aol_feature
+    from spa.proc.model_utils import Dataset, load_dataset, compute_aol_feature, read_merged
+    from spa.proc.learners import (DEFAULT_LEARNER, LEARNERS, cv_predict, group_metrics, load_params, make_learner,
+                                   regression_metrics)
+    from spa.proc.cv_cache import CACHE_DIR, CACHE_MAX_MB, open_cache
+    from spa.proc.tree_export import can_export, export_trees
 except ImportError:
     import sys
 
     sys.path.append(str(Path(__file__).resolve().parents[2]))
     import spa.proc.update_data as u
-    from spa.proc.model_utils import load_dataset, compute_aol_feature
+    from spa.proc.model_utils import Dataset, load_dataset, compute_aol_feature, read_merged
+    from spa.proc.learners import (DEFAULT_LEARNER, LEARNERS, cv_predict, group_metrics, load_params, make_learner,
+                                   regression_metrics)
+    from spa.proc.cv_cache import CACHE_DIR, CACHE_MAX_MB, open_cache
+    from spa.proc.tree_export import can_export, export_trees
 
 
 # 1) Hardcoded list of rst roots to include
@@ -116,18 +123,31 @@ SELECTED_FEATURES: List[str] = ['ipc', 'time_local', 'log_cycles', 'log_time',
 """
 
 
-def evaluate_model(model, X: pd.DataFrame, y: pd.Series):
-    loo = LeaveOneOut()
-    preds = np.zeros(len(X))
-    for tr, te in loo.split(X):
-        m = clone(model)
-        m.fit(X.iloc[tr], y.iloc[tr])
-        preds[te[0]] = m.predict(X.iloc[te])[0]
-    mae = mean_absolute_error(y, preds)
-    rmse = float(np.sqrt(mean_squared_error(y, preds)))
-    mape = float(np.mean(np.abs((y - preds) / np.clip(np.abs(y), 1e-9, None))))
-    r2 = r2_score(y, preds)
-    return {"mae": mae, "rmse": rmse, "mape": mape, "r2": r2}, preds
+def dataset_groups(index) -> np.ndarray:
+    """Dataset (rst folder) of every `<ds_name>:<workload>` row name."""
+    return np.array([str(w).split(":", 1)[0] for w in index])
+
+
+def build_cv(kind: str, n_groups: int, group_splits: int = 5):
+    if kind == "loo":
+        return LeaveOneOut()
+    if kind == "lodo":
+        return LeaveOneGroupOut()
+    if kind == "group-kfold":
+        return GroupKFold(n_splits=max(2, min(group_splits, n_groups)))
+    raise ValueError(f"Unsupported cv '{kind}'. Use 'loo', 'lodo' or 'group-kfold'.")
+
+
+def evaluate_model(model, X: pd.DataFrame, y: pd.Series, n_jobs: int = 1, cache=None, cv=None, groups=None):
+    """
+    Out-of-fold metrics of model, leave-one-out unless another splitter (with its
+    groups) is given. Folds are spread over n_jobs loky workers (-1 for all cores);
+    the predictions do not depend on n_jobs. Learners with an analytic LOO (ridge)
+    are fit once, and a CVCache hit skips fitting altogether.
+    Returns (metrics, preds, per-fold fit seconds).
+    """
+    preds, fit_seconds = cv_predict(model, X, y, cv or LeaveOneOut(), groups, n_jobs, cache)
+    return regression_metrics(y, preds), preds, fit_seconds
 
 
 def _parse_feature_list_arg(text: str) -> List[str]:
@@ -151,6 +171,25 @@ def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Train slowdown model from multiple rst roots (hardcoded list)")
     p.add_argument("--add-aol", action="store_true", help="Append AOL (A1/A3) as extra feature if available")
     p.add_argument("--out-dir", type=Path, default=Path("spa/proc/out/multi"))
+    p.add_argument("--model", choices=sorted(LEARNERS), default=DEFAULT_LEARNER,
+                   help="Learner from spa/proc/learners.py (ridge uses the analytic LOO)")
+    p.add_argument("--params-file", type=Path, default=None,
+                   help="Learner and hyperparameters written by tune_gbr.py (overrides --model)")
+    p.add_argument(
+        "--cv",
+        choices=["loo", "lodo", "group-kfold"],
+        default="loo",
+        help="loo: leave one workload out; lodo: leave one dataset (rst suite) out; group-kfold: GroupKFold on datasets",
+    )
+    p.add_argument("--group-splits", type=int, default=5, help="Folds of --cv group-kfold (capped at #datasets)")
+    p.add_argument("--n-jobs", type=int, default=-1, help="Parallel LOO folds (-1 for all cores, 1 for serial)")
+    p.add_argument("--cv-cache", type=Path, default=CACHE_DIR, help="Folder of cached out-of-fold predictions")
+    p.add_argument("--no-cv-cache", action="store_true", help="Always refit, do not read or write --cv-cache")
+    p.add_argument("--cv-cache-mb", type=float, default=CACHE_MAX_MB, help="Size cap of --cv-cache (LRU eviction)")
+    p.add_argument("--max-trial-ci", type=float, default=None,
+                   help="Drop workloads whose trial-level slowdown CI half-width (from the .output trial times) "
+                        "exceeds this; workloads without repeated trials are kept")
+    p.add_argument("--ingest-jobs", type=int, default=-1, help="Parallel rst parser processes (-1 for all cores)")
     p.add_argument(
         "--features",
         type=str,
@@ -188,12 +227,12 @@ def main() -> None:
         ds_dir = out_root / ds_name / "csv"
         ds_dir.mkdir(parents=True, exist_ok=True)
 
-        # Build CSVs into ds_dir
+        # Build CSVs into ds_dir (only folders changed since the last run are reparsed)
         u.directory = str(rst_p)
-        u.new_separate_csv(str(ds_dir))
+        u.new_separate_csv(str(ds_dir), incremental=True, jobs=args.ingest_jobs)
         u.merge_csv(str(ds_dir))
 
-        df = pd.read_csv(ds_dir / "merged.csv")
+        df = read_merged(ds_dir)
         # Prefix workload_name to avoid index collisions across datasets
         df["workload_name"] = df["workload_name"].apply(lambda w: f"{ds_name}:{w}")
         merged_parts.append(df)
@@ -201,6 +240,7 @@ def main() -> None:
     # Concatenate all merged
     merged_all = pd.concat(merged_parts, ignore_index=True)
     (combined_dir / "merged.csv").write_text(merged_all.to_csv(index=False))
+    u.write_columnar(merged_all, str(combined_dir / u.COLUMNAR_NAME))
 
     # Build features from the combined merged
     X, y = load_dataset(combined_dir, feature_mode="all")
@@ -208,6 +248,20 @@ def main() -> None:
     print(f"Available features ({len(X.columns)}):")
     print(X.columns)
 
+    stability = Dataset.load(combined_dir).trial_stability
+    if stability is not None:
+        stability.to_csv(out_root / "trial_stability.csv")
+    dropped_noisy: List[str] = []
+    if args.max_trial_ci is not None:
+        if stability is None:
+            print("[WARN] --max-trial-ci ignored: no trial times in the rst .output files")
+        else:
+            dropped_noisy = sorted(stability.index[stability["trial_ci"] > args.max_trial_ci].intersection(X.index))
+            X, y = X.drop(index=dropped_noisy), y.drop(index=dropped_noisy)
+            print(f"[INFO] Dropped {len(dropped_noisy)} workloads with trial CI > {args.max_trial_ci}:")
+            for w in dropped_noisy:
+                print(f"  {w}: slowdown {stability.at[w, 'trial_slowdown']:.3f} +- {stability.at[w, 'trial_ci']:.3f}")
+
     if args.add_aol:
         aol_df = compute_aol_feature(combined_dir)
         if aol_df is None:
@@ -246,16 +300,28 @@ def main() -> None:
         for k in kept:
             print(f"  {k}")
 
-    model = GradientBoostingRegressor(
-        loss="squared_error",
-        learning_rate=0.05,
-        n_estimators=400,
-        max_depth=3,
-        min_samples_leaf=2,
-        random_state=42,
-        subsample=0.9,
+    params = {}
+    if args.params_file:
+        args.model, params = load_params(args.params_file)
+        print(f"[INFO] {args.model} params from {args.params_file}: {params}")
+    model = make_learner(args.model, **params)
+    groups = dataset_groups(X.index)
+    cv = build_cv(args.cv, len(np.unique(groups)), args.group_splits)
+    t0 = time.perf_counter()
+    cache = open_cache(None if args.no_cv_cache else args.cv_cache, args.cv_cache_mb)
+    metrics, preds, fit_seconds = evaluate_model(
+        model, X, y, n_jobs=args.n_jobs, cache=cache, cv=cv, groups=None if args.cv == "loo" else groups
     )
-    metrics, preds = evaluate_model(model, X, y)
+    if cache is not None:
+        print(cache.summary())
+    n_folds = len(X) if args.cv == "loo" else cv.get_n_splits(X, y, groups)
+    # NaN fit seconds: the predictions came from the CV cache and nothing was fit
+    cv_cached = bool(np.isnan(fit_seconds).all())
+    print(f"{args.cv.upper()}: {n_folds} folds in {time.perf_counter() - t0:.1f}s wall "
+          + ("(loaded from the CV cache, no fits)" if cv_cached else f"(slowest fit {fit_seconds.max():.2f}s)"))
+    per_suite = group_metrics(y, preds, groups)
+    for suite, m in per_suite.items():
+        print(f"  {suite}: n={m['n']}, mae={m['mae']:.4f}" + (f", r2={m['r2']:.3f}" if "r2" in m else ""))
     final_model = clone(model).fit(X, y)
 
     importances = None
@@ -273,6 +339,7 @@ def main() -> None:
             "predicted_slowdown": preds,
             "abs_error": np.abs(y.values - preds),
             "pct_error": np.abs(y.values - preds) / np.clip(np.abs(y.values), 1e-9, None),
+            "fold_fit_seconds": fit_seconds,
         }
     ).to_csv(out_root / "predictions.csv", index=False)
 
@@ -282,7 +349,16 @@ def main() -> None:
                 "rst_list": [str(Path(r).resolve()) for r in RST_LIST],
                 "combined_csv_dir": str(combined_dir),
                 "add_aol": args.add_aol,
+                "learner": args.model,
+                "params_file": str(args.params_file) if args.params_file else None,
+                "cv": args.cv,
+                "max_trial_ci": args.max_trial_ci,
+                "dropped_noisy": dropped_noisy,
                 "metrics": metrics,
+                "per_suite_metrics": per_suite,
+                "n_jobs": args.n_jobs,
+                "cv_cached": cv_cached,
+                "fold_fit_seconds": None if cv_cached else {w: float(t) for w, t in zip(X.index, fit_seconds)},
                 "model_params": final_model.get_params(),
                 "features": list(X.columns),
                 "feature_importances": importances,
@@ -293,11 +369,17 @@ def main() -> None:
 
     bundle = {"model": final_model, "feature_columns": list(X.columns)}
     joblib.dump(bundle, out_root / "model.joblib")
+    # NumPy-only copy of the trees for the time-series scripts and the monitor
+    compiled = export_trees(final_model, list(X.columns), out_root / "model.npz") if can_export(final_model) else None
 
     print("Saved:")
     print(f"  metrics: {out_root / 'metrics.json'}")
     print(f"  predictions: {out_root / 'predictions.csv'}")
+    if stability is not None:
+        print(f"  trial stability: {out_root / 'trial_stability.csv'}")
     print(f"  model: {out_root / 'model.joblib'}")
+    if compiled is not None:
+        print(f"  compiled model: {compiled}")
 
 
 if __name__ == "__main__":
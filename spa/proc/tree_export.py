@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Tree ensembles flattened to NumPy arrays, for fast, sklearn-free prediction.
+
+train_from_multi_rst.py writes `model.npz` next to `model.joblib`: every node of
+every tree in one set of flat arrays (feature, threshold, left/right child,
+leaf value with the learning rate folded in, NaN direction), the per-tree
+roots and the constant initial prediction. Loading needs only NumPy.
+
+CompiledTrees scores a block of rows against all trees at once without walking
+them (the QuickScorer scheme): each tree keeps one bit per leaf, numbered left
+to right, and every split a row goes right at clears the bits of its left
+subtree; the row's exit leaf is then the lowest bit left. A tree's k-th split
+is evaluated for all trees in one comparison, so a block costs one pass per
+split slot (7 for max_depth=3) on (trees x rows) arrays of decisions and leaf
+bits, with no per-node index gathers. Trees are limited to 64 leaves.
+
+  python3 spa/proc/tree_export.py spa/proc/out/multi/model.joblib   # writes model.npz beside it
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+FORMAT_VERSION = 1
+# (trees x rows) cells scored per block; keeps the decision and leaf-bit arrays in cache
+BLOCK_CELLS = 1 << 17
+# One bit per leaf in the widest leaf-bit dtype
+MAX_LEAVES = 64
+
+
+def _flatten(nodes: List[dict], x_dtype: str, base: float, feature_columns: Sequence[str], learner: str) -> dict:
+    # nodes: one dict of per-node arrays per tree, children as tree-local indices (-1 at leaves)
+    offsets = np.cumsum([0] + [len(t["feature"]) for t in nodes])
+    feature, threshold, left, right, value, missing_left, depth = [], [], [], [], [], [], []
+    for off, t in zip(offsets, nodes):
+        n = len(t["feature"])
+        leaf = t["left"] < 0
+        own = np.arange(n) + off
+        # Leaves point at themselves, so extra steps past a shallow tree's depth are no-ops
+        feature.append(np.where(leaf, 0, t["feature"]))
+        threshold.append(np.where(leaf, 0.0, t["threshold"]))
+        left.append(np.where(leaf, own, t["left"] + off))
+        right.append(np.where(leaf, own, t["right"] + off))
+        value.append(np.where(leaf, t["value"], 0.0))
+        missing_left.append(np.where(leaf, True, t["missing_left"]))
+        depth.append(t["depth"])
+    return {
+        "version": np.int64(FORMAT_VERSION),
+        "learner": np.str_(learner),
+        "feature_columns": np.array(list(feature_columns), dtype=str),
+        "x_dtype": np.str_(x_dtype),
+        "base": np.float64(base),
+        "max_depth": np.int64(max(depth)),
+        "roots": offsets[:-1].astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "value": np.concatenate(value).astype(np.float64),
+        "missing_left": np.concatenate(missing_left).astype(bool),
+    }
+
+
+def _gbr_nodes(model) -> tuple:
+    trees = []
+    for est in model.estimators_[:, 0]:
+        t = est.tree_
+        trees.append({
+            "feature": t.feature, "threshold": t.threshold, "left": t.children_left, "right": t.children_right,
+            "value": model.learning_rate * t.value[:, 0, 0],
+            "missing_left": getattr(t, "missing_go_to_left", np.zeros(t.node_count, dtype=bool)),
+            "depth": t.max_depth,
+        })
+    n_features = model.n_features_in_
+    base = 0.0 if model.init_ == "zero" else float(model.init_.predict(np.zeros((1, n_features)))[0])
+    # sklearn trees compare float32 features against their thresholds
+    return trees, "float32", base
+
+
+def _hgb_nodes(model) -> tuple:
+    trees = []
+    for (predictor,) in model._predictors:
+        nodes = predictor.nodes
+        if nodes["is_categorical"].any():
+            raise ValueError("Categorical splits cannot be exported")
+        leaf = nodes["is_leaf"].astype(bool)
+        trees.append({
+            "feature": nodes["feature_idx"].astype(np.int64), "threshold": nodes["num_threshold"],
+            "left": np.where(leaf, -1, nodes["left"].astype(np.int64)),
+            "right": np.where(leaf, -1, nodes["right"].astype(np.int64)),
+            # Shrinkage is already applied to HGB leaf values
+            "value": nodes["value"], "missing_left": nodes["missing_go_to_left"].astype(bool),
+            "depth": int(nodes["depth"].max()),
+        })
+    return trees, "float64", float(np.ravel(model._baseline_prediction)[0])
+
+
+def _n_leaves(model) -> int:
+    if type(model).__name__ == "GradientBoostingRegressor":
+        return max(est.tree_.n_leaves for est in model.estimators_[:, 0])
+    return max(predictor.get_n_leaf_nodes() for (predictor,) in model._predictors)
+
+
+def can_export(model) -> bool:
+    return (type(model).__name__ in ("GradientBoostingRegressor", "HistGradientBoostingRegressor")
+            and _n_leaves(model) <= MAX_LEAVES)
+
+
+def export_trees(model, feature_columns: Sequence[str], path: Path) -> Path:
+    """Write a fitted GradientBoosting/HistGradientBoosting regressor to path (.npz)."""
+    name = type(model).__name__
+    if name == "GradientBoostingRegressor":
+        trees, x_dtype, base = _gbr_nodes(model)
+    elif name == "HistGradientBoostingRegressor":
+        trees, x_dtype, base = _hgb_nodes(model)
+    else:
+        raise ValueError(f"Cannot export {name}; only gradient-boosted tree ensembles are supported")
+    if max(int((t["left"] < 0).sum()) for t in trees) > MAX_LEAVES:
+        raise ValueError(f"Cannot export trees with more than {MAX_LEAVES} leaves")
+    path = Path(path)
+    np.savez(path, **_flatten(trees, x_dtype, base, feature_columns, name))
+    return path
+
+
+def _leaf_order(left: np.ndarray, right: np.ndarray, root: int) -> tuple:
+    # (leaves left to right, [(split node, its left subtree's leaf range)]) of one tree
+    leaves, splits = [], []
+
+    def visit(node: int) -> tuple:
+        if left[node] == node:
+            leaves.append(node)
+            return len(leaves) - 1, len(leaves)
+        lo, mid = visit(left[node])
+        splits.append((node, lo, mid))
+        return lo, visit(right[node])[1]
+
+    visit(root)
+    return leaves, splits
+
+
+class CompiledTrees:
+    """Vectorized predictor over the flat arrays written by export_trees."""
+
+    def __init__(self, arrays: dict):
+        if int(arrays["version"]) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model.npz version {int(arrays['version'])}")
+        self.learner = str(arrays["learner"])
+        self.feature_columns: List[str] = [str(c) for c in arrays["feature_columns"]]
+        self.x_dtype = np.dtype(str(arrays["x_dtype"]))
+        self.base = float(arrays["base"])
+        self.max_depth = int(arrays["max_depth"])
+        self.roots = arrays["roots"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.missing_left = arrays["missing_left"]
+        self.has_missing = bool((~self.missing_left).any())
+        self._build_slots()
+
+    @classmethod
+    def load(cls, path: Path) -> "CompiledTrees":
+        with np.load(path) as data:
+            return cls({k: data[k] for k in data.files})
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _build_slots(self) -> None:
+        # Split k of every tree is slot k: feature, threshold, NaN direction and the leaf bits it clears
+        trees = [_leaf_order(self.left, self.right, int(r)) for r in self.roots]
+        n_leaves = max(len(leaves) for leaves, _ in trees)
+        if n_leaves > MAX_LEAVES:
+            raise ValueError(f"Trees with more than {MAX_LEAVES} leaves are not supported")
+        self._bits = next(np.dtype(t) for t in ("u1", "u2", "u4", "u8") if np.dtype(t).itemsize * 8 >= n_leaves)
+        n_slots = max(len(splits) for _, splits in trees)
+        threshold = self.threshold
+        if self.x_dtype == np.float32:
+            # x > t equals x > (largest float32 <= t) for float32 x, so compare in float32
+            t32 = threshold.astype(np.float32)
+            threshold = np.where(t32 > threshold, np.nextafter(t32, np.float32(-np.inf)), t32)
+        # Unused slots never go right
+        self._slot_feature = np.zeros((n_slots, self.n_trees), dtype=np.intp)
+        self._slot_threshold = np.full((n_slots, self.n_trees), np.inf, dtype=threshold.dtype)
+        self._slot_nan_right = np.zeros((n_slots, self.n_trees), dtype=bool)
+        self._slot_clear = np.zeros((n_slots, self.n_trees), dtype=self._bits)
+        self._leaf_value = np.zeros((self.n_trees, n_leaves))
+        for t, (leaves, splits) in enumerate(trees):
+            for k, (node, lo, mid) in enumerate(splits):
+                self._slot_feature[k, t] = self.feature[node]
+                self._slot_threshold[k, t] = threshold[node]
+                self._slot_nan_right[k, t] = not self.missing_left[node]
+                self._slot_clear[k, t] = (1 << mid) - (1 << lo)
+            self._leaf_value[t, : len(leaves)] = self.value[leaves]
+        if self._bits.itemsize == 1:
+            # Leaf value of every possible leaf-bit byte: its lowest set bit
+            lowest = np.array([(b & -b).bit_length() - 1 for b in range(1, 256)])
+            self._byte_value = np.concatenate([self._leaf_value[:, :1], self._leaf_value[:, lowest]], axis=1).ravel()
+
+    def _predict_block(self, Xt: np.ndarray) -> np.ndarray:
+        # Xt: features x rows
+        shape = (self.n_trees, Xt.shape[1])
+        bits = np.full(shape, np.iinfo(self._bits).max, dtype=self._bits)
+        go_right = np.empty(shape, dtype=bool)
+        clear = np.empty(shape, dtype=self._bits)
+        check_nan = self.has_missing and np.isnan(Xt).any()
+        for k in range(len(self._slot_feature)):
+            x = Xt[self._slot_feature[k]]
+            # NaN compares False and goes left unless the split sends missing values right
+            np.greater(x, self._slot_threshold[k][:, None], out=go_right)
+            if check_nan:
+                go_right |= np.isnan(x) & self._slot_nan_right[k][:, None]
+            np.multiply(go_right, self._slot_clear[k][:, None], out=clear)
+            bits &= ~clear
+        tree_start = np.arange(self.n_trees, dtype=np.intp)[:, None]
+        if self._bits.itemsize == 1:
+            idx = bits.astype(np.intp)
+            idx += tree_start * 256
+            return self.base + self._byte_value.take(idx).sum(axis=0)
+        # Exit leaf = lowest set bit, found as the exponent of the isolated bit
+        lowest = np.frexp(bits & (~bits + 1))[1].astype(np.intp) - 1
+        lowest += tree_start * self._leaf_value.shape[1]
+        return self.base + self._leaf_value.take(lowest).sum(axis=0)
+
+    def predict(self, X) -> np.ndarray:
+        """Predictions for a 2-D array or DataFrame whose columns follow feature_columns."""
+        X = np.ascontiguousarray(X, dtype=self.x_dtype)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != len(self.feature_columns):
+            raise ValueError(f"Expected {len(self.feature_columns)} features, got {X.shape[1]}")
+        out = np.empty(len(X))
+        rows = max(1, BLOCK_CELLS // self.n_trees)
+        for start in range(0, len(X), rows):
+            out[start : start + rows] = self._predict_block(np.ascontiguousarray(X[start : start + rows].T))
+        return out
+
+
+def load_compiled(path: Path) -> Optional[CompiledTrees]:
+    """CompiledTrees from path, or None when it does not exist."""
+    path = Path(path)
+    return CompiledTrees.load(path) if path.exists() else None
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Export a model.joblib tree ensemble to model.npz")
+    p.add_argument("model", type=Path, help="model.joblib written by train_from_multi_rst.py")
+    p.add_argument("--out", type=Path, default=None, help="Output .npz (default: next to the input)")
+    args = p.parse_args()
+
+    import joblib
+
+    bundle = joblib.load(args.model)
+    model, columns = (bundle["model"], bundle["feature_columns"]) if isinstance(bundle, dict) else (bundle, None)
+    if columns is None:
+        columns = [f"x{i}" for i in range(model.n_features_in_)]
+    out = export_trees(model, columns, args.out or args.model.with_suffix(".npz"))
+    print(f"Saved {out} ({CompiledTrees.load(out).n_trees} trees)")
+
+
+if __name__ == "__main__":
+    main()
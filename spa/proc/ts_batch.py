@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Run the time-series slowdown predictors (P, AOL, ML, heuristic) over every
+workload that has `results_ts/{local,remote}.csv` and write one table.
+
+  python3 spa/proc/ts_batch.py --root spa/gapbs --out-dir spa/proc/out/ts
+
+Outputs in --out-dir:
+  ts_bins.csv     one row per (workload, bin) with actual slowdown and predictions
+  ts_summary.csv  per-workload mean / MAE / R2 of every predictor
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import List, Optional
+
+import pandas as pd
+
+try:
+    from spa.proc.timeseries import (AOL_A, AOL_B, L_LOC, L_REM, N_BINS, PREDICTORS,
+                                     analyze_workload, summarize_predictions)
+except ImportError:  # allow running as plain script
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from spa.proc.timeseries import (AOL_A, AOL_B, L_LOC, L_REM, N_BINS, PREDICTORS,
+                                     analyze_workload, summarize_predictions)
+
+LOCAL_NAME = "results_ts/local.csv"
+REMOTE_NAME = "results_ts/remote.csv"
+BIN_COLUMNS = ["timestamp", "interval_seconds", "Local_Interval_Time", "Actual_Slowdown", "AOL", "K_pred"] + PREDICTORS
+
+
+def find_workloads(root: Path) -> List[Path]:
+    """Workload folders under root holding both perf -I runs."""
+    return sorted(p.parents[1] for p in root.rglob(REMOTE_NAME) if (p.parents[1] / LOCAL_NAME).exists())
+
+
+def _run_one(workload_dir: Path, n_bins: int, model_path: Optional[Path], a: float, b: float,
+             l_loc: float, l_rem: float) -> pd.DataFrame:
+    # A model next to the workload wins over the global one
+    local_model = next((p for p in (workload_dir / "model.npz", workload_dir / "model.joblib") if p.exists()), None)
+    df = analyze_workload(workload_dir, n_bins, local_model or model_path, a, b, l_loc, l_rem)
+    df = df[BIN_COLUMNS].rename_axis("bin").reset_index()
+    df.insert(0, "workload", workload_dir.name)
+    return df
+
+
+def run_batch(workloads: List[Path], n_jobs: int = -1, n_bins: int = N_BINS, model_path: Optional[Path] = None,
+              a: float = AOL_A, b: float = AOL_B, l_loc: float = L_LOC, l_rem: float = L_REM) -> pd.DataFrame:
+    """Analyze workloads in a process pool (one workload per task), concatenated in input order."""
+    func = partial(_run_one, n_bins=n_bins, model_path=model_path, a=a, b=b, l_loc=l_loc, l_rem=l_rem)
+    n_jobs = min(n_jobs if n_jobs > 0 else (os.cpu_count() or 1), len(workloads))
+    if n_jobs <= 1:
+        frames = [func(w) for w in workloads]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            frames = list(pool.map(func, workloads))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Batch time-series slowdown predictions")
+    p.add_argument("--root", type=Path, default=Path("spa/gapbs"), help="Folder searched for results_ts/ runs")
+    p.add_argument("--out-dir", type=Path, default=Path("spa/proc/out/ts"))
+    p.add_argument("--n-jobs", type=int, default=-1, help="Parallel workloads (-1 for all cores)")
+    p.add_argument("--bins", type=int, default=N_BINS, help="Instruction bins per workload")
+    p.add_argument("--model", type=Path, default=None,
+                   help="model.joblib/model.npz used for ML_Pred when a workload has none of its own")
+    p.add_argument("--aol-a", type=float, default=AOL_A)
+    p.add_argument("--aol-b", type=float, default=AOL_B)
+    p.add_argument("--l-loc", type=float, default=L_LOC, help="Local idle latency (ns)")
+    p.add_argument("--l-rem", type=float, default=L_REM, help="Remote idle latency (ns)")
+    args = p.parse_args()
+
+    workloads = find_workloads(args.root)
+    if not workloads:
+        raise SystemExit(f"No {REMOTE_NAME} found under {args.root}")
+    print(f"{len(workloads)} workloads: {', '.join(w.name for w in workloads)}")
+
+    table = run_batch(workloads, args.n_jobs, args.bins, args.model, args.aol_a, args.aol_b, args.l_loc, args.l_rem)
+    summary = summarize_predictions(table)
+
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(args.out_dir / "ts_bins.csv", index=False)
+    summary.to_csv(args.out_dir / "ts_summary.csv")
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(summary[["bins", "actual_mean"] + [f"{c}_mae" for c in PREDICTORS]])
+    print(f"Saved {args.out_dir / 'ts_bins.csv'} and {args.out_dir / 'ts_summary.csv'}")
+
+
+if __name__ == "__main__":
+    main()
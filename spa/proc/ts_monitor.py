@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Live slowdown monitor for `perf stat -I <ms> -x,` output.
+
+Reads the interval CSV from stdin or a (growing) file while perf writes it and
+prints one line per completed interval: rolling P, the AOL prediction
+P * func_k(AOL) and the heuristic lower bound over the last --window intervals.
+Only the window is kept, so memory does not grow with the length of the run.
+
+  perf stat -I 100 -x, -e $EVENTS -- $CMD 2>&1 | python3 spa/proc/ts_monitor.py -
+  python3 spa/proc/ts_monitor.py results_ts/remote.csv --follow     # while perf -o writes it
+  python3 spa/proc/ts_monitor.py results_ts/remote.csv              # replay a finished run
+
+With --model (a model.npz from train_from_multi_rst.py, or model.joblib) it
+also prints ML_Pred for the window; counters the model needs are added to the
+tracked events. Models with whole-run features (time_local, log_time, ...)
+are rejected at startup, and ML_Pred stays NaN until every needed event has
+been counted in the stream.
+
+Unlike plot_ts.py there is no local run to compare against, so the heuristic
+uses the remote interval time minus its extra miss stall time as the local
+time, and alpha_min comes from the stream's running totals unless --alpha-min
+or a --local-csv reference run is given.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+import numpy as np
+
+try:
+    from spa.proc.timeseries import (AOL_A, AOL_B, L_LOC, L_REM, ML_FEATURES, alpha_min_from_totals, feature_inputs,
+                                     func_k, heuristic_params, load_model, load_perf_csv, process_cumulative,
+                                     unsupported_features)
+except ImportError:  # allow running as plain script
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from spa.proc.timeseries import (AOL_A, AOL_B, L_LOC, L_REM, ML_FEATURES, alpha_min_from_totals, feature_inputs,
+                                     func_k, heuristic_params, load_model, load_perf_csv, process_cumulative,
+                                     unsupported_features)
+
+WINDOW = 10
+POLL_SECONDS = 0.2
+# Counters kept per interval (columns of the ring buffer)
+MONITOR_EVENTS = [
+    "instructions",
+    "cycles",
+    "CYCLE_ACTIVITY.STALLS_L3_MISS",
+    "OFFCORE_REQUESTS_OUTSTANDING.CYCLES_WITH_DEMAND_DATA_RD",
+    "OFFCORE_REQUESTS.DEMAND_DATA_RD",
+]
+OUTPUT_COLUMNS = ["timestamp", "interval_seconds", "P_interval", "P", "AOL", "AOL_Pred", "ML_Pred", "Heuristic_Pred",
+                  "alpha_min"]
+
+
+def feature_counters(feature_columns: Sequence[str]) -> List[Tuple[Tuple[str, ...], str]]:
+    """(numerator events, denominator event) of each model feature; ValueError if one has no per-interval form."""
+    missing = unsupported_features(feature_columns)
+    if missing:
+        raise ValueError(f"Model features not computable from perf intervals: {missing}")
+    return [feature_inputs(name) for name in feature_columns]
+
+
+def follow_lines(stream: TextIO, follow: bool = False, poll: float = POLL_SECONDS,
+                 idle_exit: Optional[float] = None) -> Iterator[str]:
+    """
+    Yield complete lines of a stream. With follow, keep polling at EOF like
+    `tail -f` (partial lines are held back until their newline arrives) and stop
+    after idle_exit seconds without new data.
+    """
+    pending = ""
+    idle = 0.0
+    while True:
+        chunk = stream.readline()
+        if chunk:
+            idle = 0.0
+            pending += chunk
+            if pending.endswith("\n"):
+                yield pending
+                pending = ""
+            continue
+        if not follow or (idle_exit is not None and idle >= idle_exit):
+            break
+        time.sleep(poll)
+        idle += poll
+    if pending:
+        yield pending
+
+
+def perf_intervals(lines: Iterable[str], events=MONITOR_EVENTS) -> Iterator[Tuple[float, np.ndarray]]:
+    """
+    Group `timestamp,value,unit,event,...` rows into (timestamp, counters) per
+    interval. An interval is complete once all events were seen or the next
+    timestamp shows up; uncounted events are NaN.
+    """
+    index = {e: i for i, e in enumerate(events)}
+    current_ts = None
+    values = np.full(len(events), np.nan)
+    seen = 0
+    done = False
+    for line in lines:
+        if not line.strip() or line.startswith("#"):
+            continue
+        fields = line.split(",")
+        if len(fields) < 4:
+            continue
+        try:
+            ts = float(fields[0])
+        except ValueError:
+            continue
+        if ts != current_ts:
+            if current_ts is not None and not done:
+                yield current_ts, values
+            current_ts = ts
+            values = np.full(len(events), np.nan)
+            seen = 0
+            done = False
+        i = index.get(fields[3])
+        if i is None or done:
+            continue
+        try:
+            values[i] = float(fields[1])
+        except ValueError:  # <not counted> / <not supported>
+            pass
+        seen += 1
+        if seen == len(events):
+            # Emit without waiting for the next interval to be written
+            done = True
+            yield current_ts, values
+    if current_ts is not None and not done:
+        yield current_ts, values
+
+
+class SlowdownMonitor:
+    """
+    Fixed-size ring buffer of recent intervals with rolling predictors. An
+    optional model (anything with predict, e.g. tree_export.CompiledTrees) gets
+    its feature_columns from the window's counter sums.
+    """
+
+    def __init__(self, window: int = WINDOW, a: float = AOL_A, b: float = AOL_B,
+                 l_loc: float = L_LOC, l_rem: float = L_REM, alpha_min: Optional[float] = None,
+                 model=None, feature_columns: Optional[Sequence[str]] = None):
+        self.window = window
+        self.a, self.b = a, b
+        self.l_rem = l_rem
+        self.delta_l = l_rem - l_loc
+        self.fixed_alpha_min = alpha_min
+        self.model = model
+        self.events = list(MONITOR_EVENTS)
+        feats = feature_counters(feature_columns or []) if model is not None else []
+        needed = dict.fromkeys(e for nums, den in feats for e in nums + (den,))
+        self.events += [e for e in needed if e not in self.events]
+        # Column 0 is the interval length, then self.events
+        self.ring = np.zeros((window, 1 + len(self.events)))
+        self.n = 0
+        self.last_ts = 0.0
+        # Running totals for alpha_min: seconds, cycles, stalls, misses
+        self.totals = np.zeros(4)
+        col = {e: 1 + i for i, e in enumerate(self.events)}
+        self._cycles = col["cycles"]
+        self._stalls = col["CYCLE_ACTIVITY.STALLS_L3_MISS"]
+        self._a1 = col["OFFCORE_REQUESTS_OUTSTANDING.CYCLES_WITH_DEMAND_DATA_RD"]
+        self._a3 = col["OFFCORE_REQUESTS.DEMAND_DATA_RD"]
+        # Feature = window sums of its numerator events (weights) / window sum of its denominator
+        self._feat_num = np.zeros((len(feats), 1 + len(self.events)))
+        for i, (nums, _) in enumerate(feats):
+            self._feat_num[i, [col[e] for e in nums]] = 1.0
+        self._feat_den = np.array([col[d] for _, d in feats], dtype=np.intp)
+        self._feat_events = np.array([col[e] - 1 for e in needed], dtype=np.intp)
+        # Events counted at least once; the model is not fed zeros for events the stream lacks
+        self.counted = np.zeros(len(self.events), dtype=bool)
+
+    def alpha_min(self) -> float:
+        if self.fixed_alpha_min is not None:
+            return self.fixed_alpha_min
+        seconds, cycles, stalls, misses = self.totals
+        if cycles <= 0 or seconds <= 0 or stalls <= 0:
+            return 0.0
+        # The stream is the remote run, so its stall time is measured at l_rem
+        return alpha_min_from_totals(stalls, cycles, misses, seconds, self.l_rem)[2]
+
+    def update(self, ts: float, counters: np.ndarray) -> Dict[str, float]:
+        """Add one interval and return the predictors for the current window."""
+        self.counted |= ~np.isnan(counters)
+        row = np.concatenate(([ts - self.last_ts], np.nan_to_num(counters)))
+        self.last_ts = ts
+        self.ring[self.n % self.window] = row
+        self.n += 1
+        self.totals += row[[0, self._cycles, self._stalls, self._a3]]
+
+        win = self.ring[: min(self.n, self.window)].sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p_interval = row[self._stalls] / row[self._cycles]
+            p = win[self._stalls] / win[self._cycles]
+            aol = win[self._a1] / win[self._a3] if win[self._a3] > 0 else np.nan
+            aol_pred = p * func_k(aol, self.a, self.b)
+            ml_pred = np.nan
+            if self.model is not None and self.counted[self._feat_events].all():
+                x = (self._feat_num @ win) / win[self._feat_den]
+                ml_pred = float(self.model.predict(np.nan_to_num(x, posinf=0.0, neginf=0.0)[None, :])[0])
+        alpha_min = self.alpha_min()
+        # Extra stall time of the window's misses, against the time left without it
+        extra = win[self._a3] * alpha_min * self.delta_l * 1e-9
+        t_loc = win[0] - extra
+        heuristic = extra / t_loc if t_loc > 1e-5 else 0.0
+        return {
+            "timestamp": ts, "interval_seconds": row[0], "P_interval": p_interval, "P": p,
+            "AOL": aol, "AOL_Pred": aol_pred, "ML_Pred": ml_pred, "Heuristic_Pred": heuristic, "alpha_min": alpha_min,
+        }
+
+
+def local_alpha_min(local_csv: Path, l_loc: float = L_LOC) -> float:
+    """alpha_min from a finished local reference run, as plot_ts.py computes it."""
+    return heuristic_params(process_cumulative(load_perf_csv(local_csv).dropna()), l_loc)[2]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Live slowdown monitor for perf stat -I -x, output")
+    p.add_argument("input", help="perf stat -I -x, CSV file, or - for stdin")
+    p.add_argument("--follow", action="store_true", help="Keep reading as the file grows (tail -f)")
+    p.add_argument("--idle-exit", type=float, default=None, help="With --follow, stop after N seconds without data")
+    p.add_argument("--window", type=int, default=WINDOW, help="Intervals in the rolling window")
+    p.add_argument("--aol-a", type=float, default=AOL_A)
+    p.add_argument("--aol-b", type=float, default=AOL_B)
+    p.add_argument("--l-loc", type=float, default=L_LOC, help="Local idle latency (ns)")
+    p.add_argument("--l-rem", type=float, default=L_REM, help="Remote idle latency (ns)")
+    p.add_argument("--alpha-min", type=float, default=None, help="Fixed alpha_min for the heuristic")
+    p.add_argument("--local-csv", type=Path, default=None,
+                   help="Local perf -I run used to compute alpha_min (as plot_ts.py does)")
+    p.add_argument("--model", type=Path, default=None,
+                   help="model.npz (or model.joblib) from train_from_multi_rst.py for ML_Pred")
+    args = p.parse_args()
+
+    alpha_min = args.alpha_min
+    if alpha_min is None and args.local_csv is not None:
+        alpha_min = local_alpha_min(args.local_csv, args.l_loc)
+    model, feature_columns = load_model(args.model) if args.model is not None else (None, None)
+    try:
+        monitor = SlowdownMonitor(args.window, args.aol_a, args.aol_b, args.l_loc, args.l_rem, alpha_min,
+                                  model, feature_columns or ML_FEATURES)
+    except ValueError as e:
+        raise SystemExit(f"--model {args.model}: {e}")
+
+    stream = sys.stdin if args.input == "-" else open(args.input)
+    out = sys.stdout
+    out.write(",".join(OUTPUT_COLUMNS) + "\n")
+    try:
+        for ts, counters in perf_intervals(follow_lines(stream, args.follow, idle_exit=args.idle_exit), monitor.events):
+            res = monitor.update(ts, counters)
+            out.write(",".join(f"{res[c]:.6g}" for c in OUTPUT_COLUMNS) + "\n")
+            out.flush()
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+if __name__ == "__main__":
+    main()
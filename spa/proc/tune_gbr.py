@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Successive-halving hyperparameter search for the slowdown learner.
+
+Samples configurations of learning rate, depth, estimators, subsample and
+min_samples_leaf, scores all of them on a few repeated k-fold folds, keeps the
+best 1/eta by MAE and gives the survivors eta times more folds until one
+configuration has run on every fold or --time-budget is spent. The learner
+defaults are always candidate 0, so the winner is never worse than them on the
+folds it was compared on.
+
+  python3 spa/proc/tune_gbr.py --dataset spa/proc/out/multi/combined --time-budget 600
+
+The winning params go to --out (spa/proc/out/gbr_params.json), which
+train_from_multi_rst.py and feature_ablation_pro.py read with --params-file.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import math
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.model_selection import RepeatedKFold
+
+try:
+    from spa.proc.model_utils import load_dataset
+    from spa.proc.learners import PARAMS_FILE, make_learner, save_params, share_matrix
+except ImportError:  # allow running as plain script
+    import sys
+
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from spa.proc.model_utils import load_dataset
+    from spa.proc.learners import PARAMS_FILE, make_learner, save_params, share_matrix
+
+# Values sampled per learner; n_estimators maps to max_iter for hgb
+SEARCH_SPACES: Dict[str, Dict[str, list]] = {
+    "gbr": {
+        "learning_rate": [0.02, 0.05, 0.1, 0.2],
+        "max_depth": [2, 3, 4, 5],
+        "n_estimators": [200, 400, 600, 800],
+        "subsample": [0.6, 0.8, 0.9, 1.0],
+        "min_samples_leaf": [1, 2, 4, 8],
+    },
+    "hgb": {
+        "learning_rate": [0.02, 0.05, 0.1, 0.2],
+        "max_depth": [2, 3, 4, 5],
+        "n_estimators": [200, 400, 600, 800],
+        "min_samples_leaf": [1, 2, 4, 8],
+        "l2_regularization": [0.0, 0.1, 1.0],
+    },
+}
+
+
+def sample_candidates(space: Dict[str, list], n: int, seed: int = 42) -> List[Dict]:
+    """Learner defaults ({}) plus up to n - 1 distinct random points of the grid."""
+    rng = np.random.RandomState(seed)
+    keys = sorted(space)
+    n_grid = math.prod(len(space[k]) for k in keys)
+    seen = set()
+    out: List[Dict] = [{}]
+    while len(out) < min(n, n_grid + 1):
+        point = tuple(int(rng.randint(len(space[k]))) for k in keys)
+        if point in seen:
+            continue
+        seen.add(point)
+        # Plain Python scalars so the winner serializes to JSON
+        out.append({k: space[k][i] for k, i in zip(keys, point)})
+    return out
+
+
+def _fit_fold(name: str, params: Dict, Xv: np.ndarray, yv: np.ndarray,
+              tr: np.ndarray, te: np.ndarray) -> Tuple[np.ndarray, float]:
+    t0 = time.perf_counter()
+    m = make_learner(name, **params).fit(Xv[tr], yv[tr])
+    return np.abs(m.predict(Xv[te]) - yv[te]), time.perf_counter() - t0
+
+
+def successive_halving(name: str, X: pd.DataFrame, y: pd.Series, candidates: List[Dict], folds: List,
+                       eta: int = 3, min_folds: Optional[int] = None, time_budget: float = math.inf,
+                       n_jobs: int = -1, seed: int = 42) -> Tuple[int, List[Dict]]:
+    """
+    Race candidates over a shuffled fold order. Every round is one flat batch of
+    (candidate, new fold) jobs on a persistent loky pool reading X from a shared
+    memmap. A round that would overrun time_budget (estimated from the mean fit
+    time so far) is not started; the leader on the folds run so far wins.
+    Returns the index of the winner and one record per (round, candidate).
+    """
+    n_folds = len(folds)
+    order = np.random.RandomState(seed).permutation(n_folds)
+    budget = min_folds or max(1, math.ceil(n_folds / eta ** 2))
+    alive = list(range(len(candidates)))
+    # Absolute errors of every candidate's held-out rows, per fold
+    errors: Dict[int, Dict[int, np.ndarray]] = {c: {} for c in alive}
+    rounds: List[Dict] = []
+    fit_times: List[float] = []
+    t_start = time.perf_counter()
+    tmpdir = tempfile.mkdtemp(prefix="spa_tune_")
+    try:
+        Xv = share_matrix(X, tmpdir)
+        yv = y.to_numpy(dtype=np.float64)
+        with Parallel(n_jobs=n_jobs, backend="loky") as parallel:
+            n_workers = effective_n_jobs(n_jobs)
+            for r in itertools.count():
+                budget = min(budget, n_folds)
+                new_folds = [int(k) for k in order[len(errors[alive[0]]):budget]]
+                if fit_times:
+                    estimate = np.mean(fit_times) * len(alive) * len(new_folds) / n_workers
+                    if time.perf_counter() - t_start + estimate > time_budget:
+                        print(f"[INFO] Time budget reached, stopping before round {r} ({estimate:.0f}s estimated)")
+                        break
+                jobs = [(c, k) for c in alive for k in new_folds]
+                results = parallel(
+                    delayed(_fit_fold)(name, candidates[c], Xv, yv, *folds[k]) for c, k in jobs
+                )
+                for (c, k), (err, secs) in zip(jobs, results):
+                    errors[c][k] = err
+                    fit_times.append(secs)
+                scores = {c: float(np.concatenate(list(errors[c].values())).mean()) for c in alive}
+                rounds += [{"round": r, "candidate": c, "folds": budget, "mae": scores[c], **candidates[c]}
+                           for c in alive]
+                alive = sorted(alive, key=lambda c: scores[c])
+                print(f"round {r}: {len(jobs)} fits on {budget}/{n_folds} folds, "
+                      f"best mae={scores[alive[0]]:.4f} ({time.perf_counter() - t_start:.1f}s)")
+                if budget >= n_folds or len(alive) == 1:
+                    break
+                alive = alive[: max(1, math.ceil(len(alive) / eta))]
+                budget *= eta
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return alive[0], rounds
+
+
+def parse_args() -> argparse.Namespace:
+    p = argparse.ArgumentParser(description="Successive-halving hyperparameter search for the slowdown learner")
+    p.add_argument("--dataset", type=Path, default=Path("spa/proc/out/multi/combined"),
+                   help="Folder containing merged.csv")
+    p.add_argument("--feature-mode", choices=["minimal", "all"], default="all")
+    p.add_argument("--features", type=str, default=None, help="Comma-separated subset of the feature columns")
+    p.add_argument("--model", choices=sorted(SEARCH_SPACES), default="gbr")
+    p.add_argument("--n-candidates", type=int, default=27, help="Sampled configurations, learner defaults included")
+    p.add_argument("--rkf-splits", type=int, default=5)
+    p.add_argument("--rkf-repeats", type=int, default=3)
+    p.add_argument("--eta", type=int, default=3, help="Keep 1/eta of candidates, eta x folds per round")
+    p.add_argument("--min-folds", type=int, default=None, help="Folds in the first round (default n_folds / eta^2)")
+    p.add_argument("--time-budget", type=float, default=600.0, help="Wall seconds; no round is started past it")
+    p.add_argument("--n-jobs", type=int, default=-1, help="Parallel fits (-1 for all cores)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", type=Path, default=PARAMS_FILE, help="Params file for --params-file")
+    p.add_argument("--out-csv", type=Path, default=None, help="Per-round scores of every candidate")
+    return p.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    X, y = load_dataset(args.dataset, feature_mode=args.feature_mode)
+    if args.features:
+        X = X[[c.strip() for c in args.features.split(",") if c.strip()]]
+    print(f"{args.dataset}: {len(X)} workloads, {X.shape[1]} features")
+
+    candidates = sample_candidates(SEARCH_SPACES[args.model], args.n_candidates, args.seed)
+    cv = RepeatedKFold(n_splits=args.rkf_splits, n_repeats=args.rkf_repeats, random_state=args.seed)
+    folds = list(cv.split(X, y))
+    t0 = time.perf_counter()
+    best, rounds = successive_halving(args.model, X, y, candidates, folds, args.eta, args.min_folds,
+                                      args.time_budget, args.n_jobs, args.seed)
+    elapsed = time.perf_counter() - t0
+
+    table = pd.DataFrame(rounds)
+    final = table[table["candidate"] == best].iloc[-1]
+    default = table[table["candidate"] == 0]
+    # Winner params spelled out in full so the file does not depend on learner defaults
+    params = {k: v for k, v in make_learner(args.model, **candidates[best]).get_params().items()
+              if k in SEARCH_SPACES[args.model] or k in ("n_estimators", "max_iter")}
+    if args.model == "hgb":
+        params["n_estimators"] = params.pop("max_iter")
+    save_params(
+        args.out,
+        args.model,
+        params,
+        dataset=str(args.dataset),
+        feature_mode=args.feature_mode,
+        features=list(X.columns),
+        cv={"kind": "rkf", "splits": args.rkf_splits, "repeats": args.rkf_repeats, "seed": args.seed},
+        mae=float(final["mae"]),
+        folds=int(final["folds"]),
+        n_folds=len(folds),
+        default_mae=float(default["mae"].iloc[-1]),
+        default_folds=int(default["folds"].iloc[-1]),
+        n_candidates=len(candidates),
+        n_fits=int(table.groupby("candidate")["folds"].max().sum()),
+        elapsed_seconds=elapsed,
+    )
+    print(f"Best (candidate {best}): mae={final['mae']:.4f} on {int(final['folds'])}/{len(folds)} folds "
+          f"in {elapsed:.1f}s; defaults: mae={default['mae'].iloc[-1]:.4f} on {int(default['folds'].iloc[-1])} folds")
+    print(f"  {params}")
+    print(f"Saved {args.out}")
+    if args.out_csv:
+        args.out_csv.parent.mkdir(parents=True, exist_ok=True)
+        table.to_csv(args.out_csv, index=False)
+        print(f"Saved {args.out_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import sys
-import csv
 import numpy as np
 import os
 import math
@@ -7,10 +6,28 @@ import pandas as pd
 from collections import OrderedDict
 from pathlib import Path
 import argparse
+import hashlib
+import json
+import re
+from concurrent.futures import ProcessPoolExecutor
 
 directory = 'rst'
 mem_types = ["LOCAL", "NUMA"]
 type_to_file = {"LOCAL": "L100-100.data", "NUMA": "L0-1.data"}
+file_to_type = {v: k for k, v in type_to_file.items()}
+
+# Incremental ingestion keeps one manifest per csv folder; bump the version
+# whenever read_file's output changes so stale records get reparsed.
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 3
+# Below this many files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 32
+# Typed, memory-mappable copy of merged.csv read by model_utils.read_merged
+COLUMNAR_NAME = 'merged.feather'
+# Every tier in one (workload_name, tier, counter, value) table
+LONG_NAME = 'long.csv'
+LONG_COLUMNAR_NAME = 'long.feather'
+id_columns = ("workload_id", "workload_name", "mem_type")
 
 events = [
   "time",
@@ -31,48 +48,400 @@ events = [
   "MEM_LOAD_RETIRED.L3_MISS",
 ]
 
-def read_file(file, workload_id, workload_name, mem_type, skip_not_counted=False):
+# Single hash lookup per counter line instead of scanning every event name
+event_index = {e: i for i, e in enumerate(events) if e != "time"}
+# "<float> seconds <kind> ..." footer lines of perf stat
+seconds_fields = {"time": "elapsed", "user": "user", "sys": "sys"}
+
+def parse_perf_stat(file):
+  """
+  Parse one `perf stat` output file in a single pass.
+
+  Returns a dict with
+    counters:      OrderedDict event -> value (file order, known events only)
+    multiplex:     event -> percentage of time the counter was scheduled
+    not_counted:   events reported as <not counted>
+    not_supported: events reported as <not supported>
+    elapsed/user/sys: seconds from the footer (None if absent)
+  """
+  stat = {"counters": OrderedDict(), "multiplex": {}, "not_counted": [], "not_supported": [],
+          "elapsed": None, "user": None, "sys": None}
+  counters = stat["counters"]
+  with open(file) as fh:
+    for line in fh:
+      parts = line.split()
+      if len(parts) < 2:
+        continue
+      head, name = parts[0], parts[1]
+      if head == '<not':
+        # "<not counted> EVENT ..." / "<not supported> EVENT ..."
+        if len(parts) >= 3:
+          key = "not_counted" if name == 'counted>' else "not_supported"
+          stat[key].append(parts[2])
+        continue
+      if name == 'seconds':
+        field = seconds_fields.get(parts[2]) if len(parts) >= 3 else None
+        if field is not None:
+          stat[field] = float(head)
+        continue
+      if name not in event_index:
+        # Unit-suffixed counters, e.g. "1234.5 msec task-clock"
+        if len(parts) < 3 or parts[2] not in event_index:
+          continue
+        name = parts[2]
+      try:
+        value = float(head.replace(',', ''))
+      except ValueError:
+        continue
+      counters[name] = value
+      last = parts[-1]
+      if last[0] == '(' and last.endswith('%)'):
+        stat["multiplex"][name] = float(last[1:-2])
+  return stat
+
+# Files run.sh writes next to each L*.data; parsed into run_* columns, which
+# model_utils keeps out of the feature matrices (ARTIFACT_PREFIX)
+artifact_exts = ('.time', '.mem', '.output', '.sysinfo')
+# GNU time fields (TIME_FORMAT in */run.sh) -> column
+time_fields = OrderedDict([
+  ("Real", "run_real_s"),
+  ("User", "run_user_s"),
+  ("Sys", "run_sys_s"),
+  ("Avg-total-Mem-kb", "run_avg_mem_kb"),
+  ("Max-RSS-kb", "run_max_rss_kb"),
+  ("Nr-voluntary-context-switches", "run_voluntary_cs"),
+  ("Cmd-exit-status", "run_exit_status"),
+])
+# Separators of run_trial_times: ';' between PBBS inputs, ',' between trials
+TRIAL_GROUP_SEP = ';'
+TRIAL_SEP = ','
+pbbs_round = re.compile(r"'([-+0-9.eE]+)'")
+numa_free = re.compile(r"^node (\d+) free: (\d+) MB")
+
+def parse_time(file):
+  """GNU time output (`Key: value` lines) -> run_* columns."""
+  res = OrderedDict()
+  with open(file, errors='replace') as fh:
+    for line in fh:
+      key, sep, rest = line.partition(':')
+      col = time_fields.get(key.strip()) if sep else None
+      if col is None or not rest.split():
+        continue
+      try:
+        res[col] = float(rest.split()[0])
+      except ValueError:
+        pass
+  return res
+
+def parse_sysinfo(file):
+  """
+  get_sysinfo (config.sh) output: kernel, CPU model, online CPUs, NUMA nodes,
+  and the per-node free MB right before the run (`free_mb`, not a column).
+  """
+  res = OrderedDict()
+  free_mb = {}
+  with open(file, errors='replace') as fh:
+    for i, line in enumerate(fh):
+      if i == 0:
+        parts = line.split()
+        if len(parts) >= 3:
+          res["run_kernel"] = parts[2]
+        continue
+      m = numa_free.match(line)
+      if m:
+        free_mb[int(m.group(1))] = float(m.group(2))
+        continue
+      key, sep, rest = line.partition(':')
+      if not sep:
+        continue
+      key, rest = key.strip(), rest.strip()
+      if key == "Model name" and "run_cpu_model" not in res:
+        res["run_cpu_model"] = rest
+      elif key == "CPU(s)" and "run_cpus" not in res:
+        res["run_cpus"] = float(rest)
+      elif key == "On-line CPU(s) list" and "run_online_cpus" not in res:
+        res["run_online_cpus"] = float(cpu_list_len(rest))
+      elif key == "NUMA node(s)" and "run_numa_nodes" not in res:
+        res["run_numa_nodes"] = float(rest)
+      elif key == "processor":
+        # /proc/cpuinfo and /proc/meminfo carry nothing used here
+        break
+  res["free_mb"] = free_mb
+  return res
+
+def cpu_list_len(cpus):
+  """Number of CPUs in a list like `0-9,20-29`."""
+  n = 0
+  for part in cpus.split(','):
+    lo, _, hi = part.strip().partition('-')
+    if lo:
+      n += int(hi or lo) - int(lo) + 1
+  return n
+
+def parse_mem(file, free_mb=None):
+  """
+  monitor_resource_util (config.sh) samples: `date HHMMSS <free MB per node>`
+  every 5 s. The footprint of a sample is the drop of free memory summed over
+  nodes against `free_mb` (sysinfo, taken just before the run) or, without it,
+  against the first sample.
+  """
+  rows = []
+  with open(file, errors='replace') as fh:
+    for line in fh:
+      parts = line.split()
+      if len(parts) < 3:
+        continue
+      try:
+        rows.append([float(v) for v in parts[2:]])
+      except ValueError:
+        continue
+  width = min((len(r) for r in rows), default=0)
+  if width == 0:
+    return OrderedDict()
+  free = np.array([r[:width] for r in rows])
+  if free_mb and all(n in free_mb for n in range(width)):
+    base = np.array([free_mb[n] for n in range(width)])
+  else:
+    base = free[0]
+  used = np.clip(base - free, 0, None).sum(axis=1)
+  return OrderedDict([("run_mem_samples", float(len(used))),
+                      ("run_mem_peak_mb", float(used.max())),
+                      ("run_mem_avg_mb", float(used.mean()))])
+
+def parse_trials(file):
+  """
+  Per-trial times (s) of a benchmark log as a list of groups: one group of
+  GAPBS `Trial Time:` lines, or one group per PBBS input (`'t1', 't2', geomean = g`).
+  """
+  groups = []
+  trials = []
+  with open(file, errors='replace') as fh:
+    for line in fh:
+      if line.startswith('Trial Time:'):
+        try:
+          trials.append(float(line.split()[2]))
+        except (IndexError, ValueError):
+          pass
+      elif 'geomean =' in line:
+        rounds = [float(v) for v in pbbs_round.findall(line)]
+        if rounds:
+          groups.append(rounds)
+  if trials:
+    groups.insert(0, trials)
+  return groups
+
+def trial_stats(groups):
+  """
+  run_trial_* columns of parse_trials groups. run_trial_cv is the std/mean
+  within each group, averaged over groups weighted by trial count, so PBBS
+  inputs of different sizes do not count as variance.
+  """
+  res = OrderedDict()
+  groups = [g for g in groups if g]
+  if not groups:
+    return res
+  t = np.concatenate([np.asarray(g, dtype=float) for g in groups])
+  n = np.array([len(g) for g in groups], dtype=float)
+  cv = np.array([np.std(g) / np.mean(g) if np.mean(g) > 0 else np.nan for g in groups])
+  res["run_trials"] = float(len(t))
+  res["run_trial_mean_s"] = float(t.mean())
+  res["run_trial_min_s"] = float(t.min())
+  res["run_trial_max_s"] = float(t.max())
+  res["run_trial_std_s"] = float(t.std())
+  res["run_trial_cv"] = float(np.nansum(cv * n) / n[~np.isnan(cv)].sum()) if (~np.isnan(cv)).any() else float('nan')
+  res["run_trial_times"] = TRIAL_GROUP_SEP.join(TRIAL_SEP.join(repr(v) for v in g) for g in groups)
+  return res
+
+def artifact_files(data_file):
+  """Existing `.time/.mem/.output/.sysinfo` siblings of an L*.data file, by extension."""
+  stem = data_file[:-len('.data')]
+  return OrderedDict((ext, stem + ext) for ext in artifact_exts if os.path.isfile(stem + ext))
+
+def read_artifacts(data_file):
+  """run_* columns from the run artifacts next to data_file; missing files add nothing."""
+  files = artifact_files(data_file)
+  res = OrderedDict()
+  free_mb = None
+  if '.sysinfo' in files:
+    info = parse_sysinfo(files['.sysinfo'])
+    free_mb = info.pop("free_mb")
+    res.update(info)
+  if '.time' in files:
+    res.update(parse_time(files['.time']))
+  if '.mem' in files:
+    res.update(parse_mem(files['.mem'], free_mb))
+  if '.output' in files:
+    res.update(trial_stats(parse_trials(files['.output'])))
+  return res
+
+def read_counters(file, workload_id, workload_name, mem_type):
+  """Record of one L*.data file: identifiers plus its perf stat counters."""
   res = OrderedDict()
   res["workload_id"] = workload_id
   res["workload_name"] = workload_name
   res["mem_type"] = mem_type
   # Note: We no longer skip the whole workload on '<not counted>' lines.
-  # Such events will simply remain missing and will be filled with 0 later.
-  with open(file) as csv_file:
-    csv_header = csv.reader(csv_file, delimiter=' ')
-    line_count = 0
-    had_not_counted = False
-    for row in csv_header:
-      line_count += 1
-      processed_row = [item for item in row if item]
-      if '<not' in processed_row and 'counted>' in processed_row:
-        had_not_counted = True
-        # keep reading other lines; this particular event won't be parsed
-        continue
-      for e in events:
-        if e in processed_row:
-          value = float(processed_row[0].replace(',', ''))
-          res[e] = value
-  if had_not_counted:
+  # Such events will simply remain missing and will be filled with 0 later;
+  # --skip-not-counted drops flagged workloads when the tables are written.
+  stat = parse_perf_stat(file)
+  res.update(stat["counters"])
+  if stat["elapsed"] is not None:
+    res["time"] = stat["elapsed"]
+  if stat["not_counted"]:
     res["__had_not_counted__"] = True
   return res
 
-def read_data(directory, mem_type, skip_not_counted=False):
-  files = []
-  for filename in os.listdir(directory):
-    files.append(filename)
-  files.sort()
-  data = []
-  for i, filename in enumerate(files):
+def read_file(file, workload_id, workload_name, mem_type):
+  """read_counters plus the run_* columns of the run's artifact files."""
+  res = read_counters(file, workload_id, workload_name, mem_type)
+  res.update(read_artifacts(file))
+  return res
+
+def resolve_jobs(jobs):
+  if jobs is None or jobs < 1:
+    return os.cpu_count() or 1
+  return jobs
+
+def _parse_job(job):
+  return read_file(*job)
+
+def _ingest_job(job):
+  return _parse_job(job), run_signature(job[0])
+
+def run_jobs(func, jobs, n_jobs=1):
+  """Map func over jobs in order, fanning out to a process pool when worthwhile."""
+  n_jobs = min(resolve_jobs(n_jobs), len(jobs))
+  if n_jobs <= 1 or len(jobs) < PARALLEL_MIN_FILES:
+    return [func(j) for j in jobs]
+  chunksize = max(1, len(jobs) // (4 * n_jobs))
+  with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+    return list(pool.map(func, jobs, chunksize=chunksize))
+
+def tier_of(data_file):
+  """Tier name of an L*.data file: LOCAL/NUMA for the classic pair, else its stem (e.g. L0-2)."""
+  name = os.path.basename(data_file)
+  return file_to_type.get(name, name[:-len('.data')])
+
+def order_tiers(tiers):
+  return [t for t in mem_types if t in tiers] + sorted(t for t in tiers if t not in mem_types)
+
+def scan_tiers(directory):
+  """
+  Walk directory once and return {tier: [parse jobs]} for every L*.data file
+  found in the per-workload folders. Workloads missing a tier are simply
+  absent from that tier's list.
+  """
+  found = {}
+  for filename in sorted(os.listdir(directory)):
     f = os.path.join(directory, filename)
-    f1 = os.path.join(f, type_to_file[mem_type])
-    assert os.path.isfile(f1)
-    res = read_file(f1, filename+'..'+mem_type, filename, mem_type, skip_not_counted=skip_not_counted)
-    data.append(res)
-  return data
-
-def tocsv(mem_type, csv_path, skip_not_counted=False):
-  data = read_data(directory, mem_type, skip_not_counted=skip_not_counted)
+    if not os.path.isdir(f):
+      continue
+    for entry in sorted(os.listdir(f)):
+      if not (entry.startswith('L') and entry.endswith('.data')):
+        continue
+      t = tier_of(entry)
+      found.setdefault(t, []).append((os.path.join(f, entry), filename+'..'+t, filename, t))
+  return OrderedDict((t, found[t]) for t in order_tiers(found))
+
+def file_signature(path, digest=True):
+  st = os.stat(path)
+  sig = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+  if digest:
+    h = hashlib.sha1()
+    with open(path, 'rb') as fh:
+      for block in iter(lambda: fh.read(1 << 20), b''):
+        h.update(block)
+    sig["sha1"] = h.hexdigest()
+  return sig
+
+def run_signature(data_file, digest=True):
+  """file_signature of data_file plus size/mtime of its artifact files."""
+  sig = file_signature(data_file, digest)
+  sig["artifacts"] = {ext: file_signature(f, digest=False) for ext, f in artifact_files(data_file).items()}
+  return sig
+
+def load_manifest(csv_path, directory):
+  """Return the per-file manifest for csv_path, or {} if missing/stale."""
+  filename = os.path.join(csv_path, MANIFEST_NAME)
+  if not os.path.exists(filename):
+    return {}
+  try:
+    with open(filename) as fh:
+      manifest = json.load(fh)
+  except (OSError, ValueError):
+    print(f"[WARN] Unreadable {filename}; reparsing everything.")
+    return {}
+  if (manifest.get("version") != MANIFEST_VERSION
+      or manifest.get("directory") != os.path.abspath(directory)):
+    return {}
+  return manifest.get("files", {})
+
+def save_manifest(csv_path, directory, files):
+  filename = os.path.join(csv_path, MANIFEST_NAME)
+  tmp = filename + '.tmp'
+  with open(tmp, 'w') as fh:
+    json.dump({"version": MANIFEST_VERSION,
+               "directory": os.path.abspath(directory),
+               "files": files}, fh)
+  os.replace(tmp, filename)
+
+def _unchanged(entry, path, sig):
+  if entry is None or entry.get("artifacts") != sig["artifacts"]:
+    return False
+  if entry["size"] == sig["size"] and entry["mtime_ns"] == sig["mtime_ns"]:
+    return True
+  # Touched but possibly identical (e.g. rsync/cp without -p): compare content
+  if entry["size"] == sig["size"] and entry.get("sha1") == file_signature(path)["sha1"]:
+    entry["mtime_ns"] = sig["mtime_ns"]
+    return True
+  return False
+
+def read_tiers(directory, jobs=1, csv_path=None):
+  """
+  Parse every tier found by scan_tiers. With csv_path, only files whose
+  size/mtime/sha1 differ from the manifest kept there are reparsed.
+  Returns ({tier: [records]}, n_parsed).
+  """
+  scan = scan_tiers(directory)
+  if csv_path is None:
+    flat = [job for tier_jobs in scan.values() for job in tier_jobs]
+    records = iter(run_jobs(_parse_job, flat, jobs))
+    data = OrderedDict((t, [next(records) for _ in tier_jobs]) for t, tier_jobs in scan.items())
+    return data, len(flat)
+
+  old = load_manifest(csv_path, directory)
+  files = {}
+  keys = OrderedDict()
+  todo = []
+  for tier, tier_jobs in scan.items():
+    keys[tier] = []
+    for job in tier_jobs:
+      key = os.path.relpath(job[0], directory)
+      keys[tier].append(key)
+      entry = old.get(key)
+      if _unchanged(entry, job[0], run_signature(job[0], digest=False)):
+        files[key] = entry
+      else:
+        todo.append((key, job))
+  for (key, _), (record, sig) in zip(todo, run_jobs(_ingest_job, [j for _, j in todo], jobs)):
+    files[key] = {**sig, "record": record}
+  save_manifest(csv_path, directory, files)
+  data = OrderedDict((t, [OrderedDict(files[k]["record"]) for k in ks]) for t, ks in keys.items())
+  return data, len(todo)
+
+def to_long(data):
+  """Flatten {tier: [records]} into a (workload_name, tier, counter, value) table."""
+  rows = []
+  for tier, records in data.items():
+    for rec in records:
+      name = rec["workload_name"]
+      for k, v in rec.items():
+        if k in id_columns or k.startswith('__') or isinstance(v, str):
+          continue
+        rows.append((name, tier, k, v))
+  return pd.DataFrame(rows, columns=["workload_name", "tier", "counter", "value"])
+
+def write_type_csv(data, mem_type, csv_path):
   if not data:
     print(f"[WARN] No entries for mem_type={mem_type} in {directory}. Writing empty CSV.")
     df = pd.DataFrame(columns=["workload_id", "workload_name", "mem_type", *events])
@@ -91,13 +460,68 @@ def tocsv(mem_type, csv_path, skip_not_counted=False):
   filename = os.path.join(csv_path, 'm'+str(mem_type)+'.csv')
   df.to_csv(filename)
 
-def new_separate_csv(csv_path, skip_not_counted=False):
+def tier_csvs(csv_path):
+  """Tiers with an m<TIER>.csv in csv_path, LOCAL/NUMA first."""
+  found = []
+  for name in os.listdir(csv_path):
+    if name.startswith('m') and name.endswith('.csv') and name != 'merged.csv':
+      found.append(name[1:-len('.csv')])
+  return order_tiers(found)
+
+def drop_not_counted(data):
+  """Remove, from every tier, the workloads with a '<not counted>' event in any tier."""
+  flagged = {rec["workload_name"] for records in data.values() for rec in records if rec.get("__had_not_counted__")}
+  kept = OrderedDict((t, [r for r in records if r["workload_name"] not in flagged]) for t, records in data.items())
+  return kept, sorted(flagged)
+
+def new_separate_csv(csv_path, skip_not_counted=False, incremental=False, jobs=1):
+  data, n_parsed = read_tiers(directory, jobs=jobs, csv_path=csv_path if incremental else None)
+  if incremental:
+    total = sum(len(v) for v in data.values())
+    print(f"[INFO] Parsed {n_parsed} of {total} data files under {directory} ({total - n_parsed} unchanged)")
+  if skip_not_counted:
+    data, dropped = drop_not_counted(data)
+    if dropped:
+      print(f"[INFO] Skipped {len(dropped)} workloads with <not counted> events: {', '.join(dropped)}")
   for lat in mem_types:
-    tocsv(lat, csv_path, skip_not_counted=skip_not_counted)
+    data.setdefault(lat, [])
+  for t in tier_csvs(csv_path):
+    if t not in data:
+      os.remove(os.path.join(csv_path, 'm'+str(t)+'.csv'))
+  for t, rows in data.items():
+    write_type_csv(rows, t, csv_path)
+  long_df = to_long(data)
+  long_df.to_csv(os.path.join(csv_path, LONG_NAME), index=False)
+  write_columnar(long_df, os.path.join(csv_path, LONG_COLUMNAR_NAME), categorical=("workload_name", "tier", "counter"))
+
+def write_columnar(df, out_file, categorical=("workload_name", "mem_type")):
+  """
+  Write df as an uncompressed Feather file so readers can memory-map it:
+  `categorical` columns become categoricals, numeric counters float64.
+  Returns False when pyarrow is not installed.
+  """
+  try:
+    import pyarrow  # noqa: F401
+  except ImportError:
+    if os.path.exists(out_file):
+      os.remove(out_file)
+    return False
+  typed = df.reset_index() if df.index.name in id_columns else df.reset_index(drop=True)
+  for col in typed.columns:
+    if col == "workload_id":
+      typed[col] = typed[col].astype(str)
+    elif col in categorical:
+      typed[col] = typed[col].astype("category")
+    elif pd.api.types.is_numeric_dtype(typed[col]) and not pd.api.types.is_bool_dtype(typed[col]):
+      typed[col] = typed[col].astype("float64")
+  tmp = out_file + '.tmp'
+  typed.to_feather(tmp, compression="uncompressed")
+  os.replace(tmp, out_file)
+  return True
 
 def merge_csv(csv_path):
   merged_df = pd.DataFrame()
-  for t in mem_types:
+  for t in order_tiers(set(mem_types) | set(tier_csvs(csv_path))):
     filename = os.path.join(csv_path, 'm'+str(t)+'.csv')
     if not os.path.exists(filename):
       print(f"[WARN] Missing {filename}; skipping.")
@@ -105,12 +529,16 @@ def merge_csv(csv_path):
     df = pd.read_csv(filename)
     merged_df = pd.concat([merged_df, df], ignore_index=True)
   out_file = os.path.join(csv_path, 'merged.csv')
+  columnar_file = os.path.join(csv_path, COLUMNAR_NAME)
   if merged_df.empty:
     print(f"[WARN] No data to merge for {csv_path}. Writing empty merged.csv")
-    pd.DataFrame(columns=["workload_id", "workload_name", "mem_type", *events]).set_index("workload_id", drop=False).to_csv(out_file, index=False)
+    empty = pd.DataFrame(columns=["workload_id", "workload_name", "mem_type", *events])
+    empty.set_index("workload_id", drop=False).to_csv(out_file, index=False)
+    write_columnar(empty, columnar_file)
     return
   merged_df.set_index("workload_id", inplace=True)
   merged_df.to_csv(out_file)
+  write_columnar(merged_df, columnar_file)
 
 def main():
   parser = argparse.ArgumentParser(description='Merge perf rst into CSVs')
@@ -118,6 +546,10 @@ def main():
   parser.add_argument('--csv-out', default='csv', help='output CSV folder (default: csv under script dir)')
   parser.add_argument('--skip-not-counted', action='store_true',
                       help='skip workloads whose perf output contains "<not counted>"')
+  parser.add_argument('--incremental', action='store_true',
+                      help='only reparse data files that changed since the last run (tracked in csv/' + MANIFEST_NAME + ')')
+  parser.add_argument('--jobs', type=int, default=-1,
+                      help='parallel parser processes (-1 for all cores)')
   args = parser.parse_args(args=None if sys.argv[0].endswith('update_data.py') else [])
 
   script_dir = Path(__file__).resolve().parent
@@ -135,7 +567,8 @@ def main():
   globals()['directory'] = str(rst_root)
 
   csv_dir.mkdir(parents=True, exist_ok=True)
-  new_separate_csv(str(csv_dir), skip_not_counted=args.skip_not_counted)
+  new_separate_csv(str(csv_dir), skip_not_counted=args.skip_not_counted,
+                   incremental=args.incremental, jobs=args.jobs)
   merge_csv(str(csv_dir))
   print(f"Wrote CSVs to {csv_dir} from rst root {rst_root}")
 
@@ -0,0 +1,69 @@
+"""mio/proc/binfmt.py: bin_header_t round-trip and sample mapping of `bench -b u32|f32` output."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from mio.proc.binfmt import HEADER_DTYPE, MAGIC, VERSION, open_samples, read_header  # noqa: E402
+from mio.proc.latency import histogram_file  # noqa: E402
+
+FIELDS = {"node": 1, "threads": 2, "mode": 0, "interval": 8, "tsc_ghz": 2.1, "iterations": 3,
+          "starting_core": -1, "random": 1}
+
+
+def _write(path: Path, samples: np.ndarray, dtype: int, **overrides) -> Path:
+    h = np.zeros(1, dtype=HEADER_DTYPE)
+    h["magic"] = np.frombuffer(MAGIC, dtype=np.uint8)
+    h["version"] = VERSION
+    h["header_size"] = HEADER_DTYPE.itemsize
+    h["dtype"] = dtype
+    h["count"] = len(samples)
+    for k, v in {**FIELDS, **overrides}.items():
+        h[k] = v
+    path.write_bytes(h.tobytes() + samples.tobytes())
+    return path
+
+
+def test_header_matches_bin_header_t():
+    # sizeof(bin_header_t) in mio/src/utils.h
+    assert HEADER_DTYPE.itemsize == 80
+
+
+@pytest.mark.parametrize("dtype, samples", [
+    (1, np.array([145, 30, 9, 2**32 - 1], dtype="<u4")),
+    (2, np.array([145.5, 30.25, 9.0], dtype="<f4")),
+])
+def test_round_trip(tmp_path, dtype, samples):
+    path = _write(tmp_path / "N0m1_2.bin", samples, dtype)
+    h, mapped = open_samples(path)
+    assert {k: h[k] for k in FIELDS} == {**FIELDS, "random": True}
+    assert (h["count"], h["mode_name"]) == (len(samples), "pc")
+    assert isinstance(mapped, np.memmap)
+    np.testing.assert_array_equal(mapped, samples)
+
+
+def test_truncated_run_keeps_complete_samples(tmp_path):
+    samples = np.arange(10, dtype="<u4")
+    path = _write(tmp_path / "N0m1_1.bin", samples, 1)
+    path.write_bytes(path.read_bytes()[:-6])
+    _, mapped = open_samples(path)
+    np.testing.assert_array_equal(mapped, samples[:8])
+
+
+def test_rejects_other_files(tmp_path):
+    text = tmp_path / "N0m1_1.bin"
+    text.write_text("145\n30\n" * 20)
+    with pytest.raises(ValueError):
+        read_header(text)
+    with pytest.raises(ValueError):
+        read_header(_write(tmp_path / "v2.bin", np.zeros(1, "<u4"), 1, version=VERSION + 1))
+
+
+def test_latency_reads_binary_runs(tmp_path):
+    samples = np.array([145.9, 30.2, 9.0], dtype="<f4")
+    hist = histogram_file(_write(tmp_path / "N0m1_1.bin", samples, 2))
+    assert (hist.total, hist.min, hist.max, hist.sum) == (3, 9, 145, 184)
@@ -0,0 +1,77 @@
+"""CV cache entries are shared by train_from_multi_rst.py (cv_predict) and feature_ablation_pro.py."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import LeaveOneOut
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from spa.proc.cv_cache import CVCache  # noqa: E402
+from spa.proc.feature_ablation_pro import SubsetScheduler  # noqa: E402
+from spa.proc.learners import cv_predict, make_learner  # noqa: E402
+
+
+def _data(n: int = 24):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(n, 3)), columns=["a", "b", "c"])
+    y = pd.Series(X["a"] * 2 - X["b"] + rng.normal(scale=0.1, size=n))
+    return X, y
+
+
+def _ablation_preds(model, X, y, cache):
+    with SubsetScheduler(model, X, y, LeaveOneOut(), 1, cache) as sched:
+        return sched.evaluate([list(X.columns)])[0][1]
+
+
+def test_ablation_entry_is_read_by_cv_predict(tmp_path):
+    X, y = _data()
+    model = make_learner("ridge")
+    cache = CVCache(tmp_path)
+    stored = _ablation_preds(model, X, y, cache)
+
+    preds, fit_seconds = cv_predict(model, X, y, LeaveOneOut(), cache=cache)
+    assert cache.hits == 1
+    np.testing.assert_allclose(preds, stored)
+    # Nothing was fit on a hit, so no fit time is reported
+    assert np.isnan(fit_seconds).all()
+
+
+def test_cv_predict_entry_is_read_by_ablation(tmp_path):
+    X, y = _data()
+    model = make_learner("ridge")
+    cache = CVCache(tmp_path)
+    stored, fit_seconds = cv_predict(model, X, y, LeaveOneOut(), cache=cache)
+    assert not np.isnan(fit_seconds).any()
+
+    preds = _ablation_preds(model, X, y, cache)
+    assert cache.hits == 1
+    np.testing.assert_allclose(preds, stored)
+
+
+def test_entry_without_preds_is_a_miss(tmp_path):
+    X, y = _data()
+    model = make_learner("ridge")
+    cache = CVCache(tmp_path)
+    first, _ = cv_predict(model, X, y, LeaveOneOut(), cache=cache)
+    entry = next(tmp_path.glob("*/*.npz"))
+    np.savez(entry, fit_seconds=np.zeros(len(X)))
+
+    preds, fit_seconds = cv_predict(model, X, y, LeaveOneOut(), cache=cache)
+    np.testing.assert_allclose(preds, first)
+    assert not np.isnan(fit_seconds).any()
+
+
+def test_evict_leaves_in_flight_writes_alone(tmp_path, monkeypatch):
+    cache = CVCache(tmp_path, max_mb=0)
+    # A put that has written its tmp file but not renamed it yet
+    with monkeypatch.context() as m:
+        m.setattr("spa.proc.cv_cache.os.replace", lambda src, dst: None)
+        cache.put("ab0001", preds=np.zeros(8))
+    (in_flight,) = (tmp_path / "ab").iterdir()
+    cache.put("ab0002", preds=np.zeros(8))
+    # Over budget, so the finished entry goes, but the other write's tmp file stays
+    assert not list(tmp_path.glob("*/*.npz"))
+    assert in_flight.exists()
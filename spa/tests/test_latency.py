@@ -0,0 +1,71 @@
+"""mio/proc/latency.py: histogram merging, percentile precision and the text reader."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from mio.proc.latency import PERCENTILES, SUB_BITS, LatencyHistogram, iter_latency_chunks  # noqa: E402
+
+
+def _latencies(n: int = 200_000, seed: int = 0) -> np.ndarray:
+    # Mostly fast hits with a long tail, spanning many power-of-two ranges
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.integers(5, 200, n // 2), rng.lognormal(8, 2, n // 2)]).astype(np.int64)
+
+
+def _exact(values: np.ndarray, q: float) -> int:
+    rank = max(1, int(np.ceil(q / 100 * len(values))))
+    return int(np.sort(values)[rank - 1])
+
+
+def test_merge_equals_histogram_of_concatenation():
+    values = _latencies()
+    parts = np.array_split(values, [1000, 70_000, 150_000])
+    merged = LatencyHistogram()
+    for part in parts:
+        h = LatencyHistogram()
+        h.record(part)
+        merged.merge(h)
+    whole = LatencyHistogram()
+    whole.record(values)
+    np.testing.assert_array_equal(merged.counts, whole.counts)
+    assert (merged.total, merged.sum, merged.min, merged.max) == (whole.total, whole.sum, whole.min, whole.max)
+    assert merged.summary() == whole.summary()
+
+
+def test_merge_rejects_other_precision():
+    with pytest.raises(ValueError):
+        LatencyHistogram().merge(LatencyHistogram(sub_bits=SUB_BITS + 1))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_percentile_error_bound(seed):
+    values = _latencies(seed=seed)
+    h = LatencyHistogram()
+    h.record(values)
+    qs = PERCENTILES + (0.1, 25, 75, 100)
+    for q, got in h.percentiles(qs).items():
+        exact = _exact(values, q)
+        # Reported as the top of the bucket holding the exact value, at most 1/128 above it
+        assert exact <= got <= exact * (1 + 2.0 ** -(SUB_BITS - 1))
+        if exact < 2**SUB_BITS:
+            assert got == exact
+
+
+def test_small_values_are_exact():
+    values = np.random.default_rng(3).integers(0, 2**SUB_BITS, 10_000)
+    h = LatencyHistogram()
+    h.record(values)
+    for q, got in h.percentiles().items():
+        assert got == _exact(values, q)
+
+
+def test_text_reader_skips_non_numeric_lines(tmp_path):
+    f = tmp_path / "N0m1_1.txt"
+    f.write_text("145\n30\nERROR 12, 1\n9.7\n\n1000\n")
+    chunks = list(iter_latency_chunks(f, chunksize=2))
+    np.testing.assert_array_equal(np.concatenate(chunks), [145, 30, 9, 1000])
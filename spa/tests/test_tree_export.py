@@ -0,0 +1,58 @@
+"""model.npz predictions (tree_export.CompiledTrees) match the sklearn models they were exported from."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from spa.proc.learners import make_learner  # noqa: E402
+from spa.proc.tree_export import CompiledTrees, can_export, export_trees  # noqa: E402
+
+
+def _data(n: int = 2000, missing: float = 0.0):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(n, 5))
+    y = 2 * X[:, 0] + np.sin(3 * X[:, 1]) + X[:, 2] * X[:, 3] + rng.normal(scale=0.1, size=n)
+    X[rng.random(X.shape) < missing] = np.nan
+    return X, y
+
+
+def _roundtrip(model, X, tmp_path) -> CompiledTrees:
+    columns = [f"x{i}" for i in range(X.shape[1])]
+    return CompiledTrees.load(export_trees(model, columns, tmp_path / "model.npz"))
+
+
+@pytest.mark.parametrize("model", [
+    make_learner("gbr", n_estimators=60),
+    make_learner("hgb", n_estimators=60),
+    # 16, 32 and 64 leaves use the wider leaf-bit dtypes
+    GradientBoostingRegressor(n_estimators=30, max_depth=4, random_state=0),
+    GradientBoostingRegressor(n_estimators=30, max_depth=5, random_state=0),
+    HistGradientBoostingRegressor(max_iter=30, max_leaf_nodes=64, max_depth=None, random_state=0),
+], ids=["gbr", "hgb", "gbr-depth4", "gbr-depth5", "hgb-64-leaves"])
+def test_compiled_matches_sklearn(model, tmp_path):
+    X, y = _data()
+    model.fit(X, y)
+    compiled = _roundtrip(model, X, tmp_path)
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=0, atol=1e-12)
+    # A single row as a 1-D array
+    np.testing.assert_allclose(compiled.predict(X[0]), model.predict(X[:1]), rtol=0, atol=1e-12)
+
+
+def test_missing_values_follow_the_split_direction(tmp_path):
+    X, y = _data(missing=0.2)
+    model = make_learner("hgb", n_estimators=60).fit(X, y)
+    compiled = _roundtrip(model, X, tmp_path)
+    np.testing.assert_allclose(compiled.predict(X), model.predict(X), rtol=0, atol=1e-12)
+
+
+def test_trees_over_64_leaves_are_not_exported(tmp_path):
+    X, y = _data()
+    model = GradientBoostingRegressor(n_estimators=3, max_depth=8, random_state=0).fit(X, y)
+    assert not can_export(model)
+    with pytest.raises(ValueError):
+        export_trees(model, [f"x{i}" for i in range(X.shape[1])], tmp_path / "model.npz")
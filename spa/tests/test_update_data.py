@@ -0,0 +1,121 @@
+"""update_data.py: perf stat parsing and the incremental ingestion manifest."""
+from __future__ import annotations
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+import spa.proc.update_data as u  # noqa: E402
+
+PERF_STAT = """\
+# started on Sun Nov  9 06:10:20 2025
+
+
+ Performance counter stats for 'numactl --cpunodebind 0 --membind 1 -- bash cmd.sh':
+
+    12,345,678,901      instructions                     #    1.23  insn per cycle              (50.01%)
+    10,037,137,318      cycles                                                                  (49.99%)
+     1,234,567.5        CYCLE_ACTIVITY.STALLS_L3_MISS
+             7,654      some.unknown.event                                                      (25.00%)
+   <not counted>        OFFCORE_REQUESTS.DEMAND_DATA_RD                                         (0.00%)
+   <not supported>      MEM_LOAD_RETIRED.L3_MISS
+
+     123.116092501 seconds time elapsed
+
+    5000.382116000 seconds user
+      50.325064000 seconds sys
+
+"""
+
+
+def _write(tmp_path: Path, text: str = PERF_STAT, name: str = "L0-1.data") -> Path:
+    f = tmp_path / name
+    f.parent.mkdir(parents=True, exist_ok=True)
+    f.write_text(text)
+    return f
+
+
+def _rst(tmp_path: Path) -> Path:
+    rst = tmp_path / "rst"
+    for workload in ("w1", "w2"):
+        for name in ("L100-100.data", "L0-1.data"):
+            _write(rst / workload, name=name)
+    (tmp_path / "csv").mkdir()
+    return rst
+
+
+def _bump_mtime(path: Path) -> None:
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+
+def test_parse_perf_stat(tmp_path):
+    stat = u.parse_perf_stat(_write(tmp_path))
+    assert stat["counters"] == {
+        "instructions": 12345678901.0,
+        "cycles": 10037137318.0,
+        "CYCLE_ACTIVITY.STALLS_L3_MISS": 1234567.5,
+    }
+    # Counters stay in file order
+    assert list(stat["counters"]) == ["instructions", "cycles", "CYCLE_ACTIVITY.STALLS_L3_MISS"]
+    assert stat["multiplex"] == {"instructions": 50.01, "cycles": 49.99}
+    assert stat["not_counted"] == ["OFFCORE_REQUESTS.DEMAND_DATA_RD"]
+    assert stat["not_supported"] == ["MEM_LOAD_RETIRED.L3_MISS"]
+    assert (stat["elapsed"], stat["user"], stat["sys"]) == (123.116092501, 5000.382116, 50.325064)
+
+
+def test_parse_perf_stat_without_footer(tmp_path):
+    stat = u.parse_perf_stat(_write(tmp_path, PERF_STAT.split("\n     123.")[0]))
+    assert stat["elapsed"] is None and stat["user"] is None
+    assert len(stat["counters"]) == 3
+
+
+def test_read_counters_record(tmp_path):
+    rec = u.read_counters(str(_write(tmp_path)), "w..NUMA", "w", "NUMA")
+    assert list(rec)[:3] == ["workload_id", "workload_name", "mem_type"]
+    assert rec["time"] == 123.116092501
+    assert rec["cycles"] == 10037137318.0
+    assert rec["__had_not_counted__"] is True
+    assert "OFFCORE_REQUESTS.DEMAND_DATA_RD" not in rec
+
+
+def test_manifest_reuses_unchanged_files(tmp_path):
+    rst, csv = _rst(tmp_path), tmp_path / "csv"
+    first, n = u.read_tiers(str(rst), csv_path=str(csv))
+    assert n == 4
+    assert list(first) == ["LOCAL", "NUMA"]
+    again, n = u.read_tiers(str(rst), csv_path=str(csv))
+    assert n == 0
+    assert again == first
+    # Touched but identical content: the sha1 keeps it cached
+    _bump_mtime(rst / "w1" / "L0-1.data")
+    assert u.read_tiers(str(rst), csv_path=str(csv))[1] == 0
+
+
+def test_manifest_reparses_changed_files(tmp_path):
+    rst, csv = _rst(tmp_path), tmp_path / "csv"
+    u.read_tiers(str(rst), csv_path=str(csv))
+    # Same size, new content
+    data = rst / "w1" / "L0-1.data"
+    data.write_text(PERF_STAT.replace("10,037,137,318", "10,037,137,319"))
+    _bump_mtime(data)
+    tiers, n = u.read_tiers(str(rst), csv_path=str(csv))
+    assert n == 1
+    assert tiers["NUMA"][0]["cycles"] == 10037137319.0
+    # A new run artifact next to the data file
+    (rst / "w2" / "L0-1.time").write_text("Real: 1.5\n")
+    tiers, n = u.read_tiers(str(rst), csv_path=str(csv))
+    assert n == 1
+    assert tiers["NUMA"][1]["run_real_s"] == 1.5
+
+
+def test_stale_manifest_is_ignored(tmp_path, monkeypatch):
+    rst, csv = _rst(tmp_path), tmp_path / "csv"
+    u.read_tiers(str(rst), csv_path=str(csv))
+    monkeypatch.setattr(u, "MANIFEST_VERSION", u.MANIFEST_VERSION + 1)
+    assert u.read_tiers(str(rst), csv_path=str(csv))[1] == 4
+    # The manifest belongs to the rst folder it was built from
+    other = tmp_path / "rst2"
+    rst.rename(other)
+    assert u.read_tiers(str(other), csv_path=str(csv))[1] == 4